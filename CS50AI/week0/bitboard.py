@@ -0,0 +1,153 @@
+"""
+Bitboard representation of Tic Tac Toe
+
+A state is a pair of ints (x, o) where bit 3 * i + j is set if that
+player has marked cell (i, j). Everything a search needs is a table
+lookup or a couple of bit operations, so no board is ever copied.
+
+Run `python bitboard.py` to compare full game tree enumeration against
+the list-of-lists board in tictactoe.py.
+"""
+
+import sys
+import time
+
+import tictactoe as ttt
+
+from tictactoe import X, O, EMPTY, LINES
+
+FULL = 0b111111111
+
+# Bit masks of every winning line
+WIN_MASKS = [sum(1 << k for k in line) for line in LINES]
+
+# Number of set bits of every 9-bit mask
+POPCOUNT = [bin(mask).count("1") for mask in range(FULL + 1)]
+
+# Whether each 9-bit mask of one player's marks contains a full line
+HAS_LINE = [any(mask & win == win for win in WIN_MASKS) for mask in range(FULL + 1)]
+
+# Free cells, as (i, j) actions, for every mask of occupied cells
+FREE_ACTIONS = [
+    tuple(divmod(k, 3) for k in range(9) if not occupied & (1 << k))
+    for occupied in range(FULL + 1)
+]
+
+
+def initial_state():
+    """
+    Returns the empty bitboard.
+    """
+    return (0, 0)
+
+
+def from_board(board):
+    """
+    Converts a list-of-lists board into a bitboard.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return (x, o)
+
+
+def to_board(state):
+    """
+    Converts a bitboard into a list-of-lists board.
+    """
+    x, o = state
+    return [
+        [X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY for j in range(3)]
+        for i in range(3)
+    ]
+
+
+def player(state):
+    """
+    Returns player who has the next turn on a bitboard.
+    """
+    x, o = state
+    return X if POPCOUNT[x] <= POPCOUNT[o] else O
+
+
+def actions(state):
+    """
+    Returns the tuple of all possible actions (i, j) on a bitboard.
+    """
+    x, o = state
+    return FREE_ACTIONS[x | o]
+
+
+def result(state, action):
+    """
+    Returns the bitboard that results from making move (i, j).
+    """
+    x, o = state
+    bit = 1 << (3 * action[0] + action[1])
+    if (x | o) & bit:
+        raise Exception("Invalid action")
+    if POPCOUNT[x] <= POPCOUNT[o]:
+        return (x | bit, o)
+    return (x, o | bit)
+
+
+def winner(state):
+    """
+    Returns the winner of the game on a bitboard, if there is one.
+    """
+    x, o = state
+    if HAS_LINE[x]:
+        return X
+    if HAS_LINE[o]:
+        return O
+    return None
+
+
+def terminal(state):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = state
+    return HAS_LINE[x] or HAS_LINE[o] or x | o == FULL
+
+
+def utility(state):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = state
+    if HAS_LINE[x]:
+        return 1
+    if HAS_LINE[o]:
+        return -1
+    return 0
+
+
+def count_games(game, state):
+    """
+    Walks the full game tree below `state` using the functions of the
+    `game` module and returns the number of nodes visited.
+    """
+    if game.terminal(state):
+        return 1
+    return 1 + sum(count_games(game, game.result(state, action)) for action in game.actions(state))
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    for name, game in [("lists", ttt), ("bitboard", sys.modules[__name__])]:
+        best = None
+        for _ in range(runs):
+            start = time.perf_counter()
+            nodes = count_games(game, game.initial_state())
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:>8}: {nodes} nodes in {best:.3f}s ({nodes / best:,.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,160 @@
+import argparse
+import bisect
 import csv
+import heapq
+import json
+import mmap
+import multiprocessing
+import os
 import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from array import array
+from collections import OrderedDict, deque
 
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
 names = {}
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
+# Maps person_ids to a dictionary of: name, birth
 people = {}
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
+# Maps movie_ids to a dictionary of: title, year
 movies = {}
 
+# Integer-indexed person-movie graph, see Graph
+graph = None
 
-def load_data(directory):
+# Binary snapshot written next to the CSV files, see write_snapshot
+SNAPSHOT_FILE = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGSNAP\0"
+SNAPSHOT_VERSION = 2
+CSV_FILES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Keeps the snapshot mapping open for as long as graph views into it
+_snapshot_map = None
+
+# Most recently used single-source searches, see distances_from
+DISTANCE_CACHE_SIZE = 16
+_distance_cache = OrderedDict()
+
+# Sources of the last HOT_WINDOW queries; find_path caches a source's whole
+# search once it fills HOT_QUERIES of them. The window is no bigger than the
+# cache, so hot sources never evict each other. Both are shared by the
+# server's threads, so use _cache_lock
+HOT_WINDOW = DISTANCE_CACHE_SIZE
+HOT_QUERIES = 3
+_recent_sources = deque(maxlen=HOT_WINDOW)
+_cache_lock = threading.Lock()
+
+# Prefix and fuzzy name lookup, built by load_data or read from the
+# snapshot, so forked batch workers and server threads share it
+_name_index = None
+
+
+class Graph():
+    """
+    Bipartite person-movie graph stored in compressed sparse row form.
+
+    People and movies are numbered densely from 0 in load order, and the
+    IMDB ids can be recovered with `person_ids` / `movie_ids`. The movies
+    of person p are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie m are `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]`.
+    """
+
+    def __init__(self, person_ids, movie_ids, person_offsets, person_movies,
+                 movie_offsets, movie_stars, person_index=None, movie_index=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        if person_index is None:
+            person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        if movie_index is None:
+            movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        self.person_index = person_index
+        self.movie_index = movie_index
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices a person index starred in.
+        """
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices that starred in a movie index.
+        """
+        return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+
+def build_csr(num_rows, rows, cols):
+    """
+    Builds (offsets, indices) arrays for the edges rows[k] -> cols[k],
+    dropping duplicate edges.
+    """
+    counts = array("i", bytes(4 * (num_rows + 1)))
+    for row in rows:
+        counts[row + 1] += 1
+    for i in range(num_rows):
+        counts[i + 1] += counts[i]
+
+    # Counting sort the edges into their rows
+    indices = array("i", bytes(4 * len(rows)))
+    fill = counts[:-1]
+    for row, col in zip(rows, cols):
+        indices[fill[row]] = col
+        fill[row] += 1
+
+    # Sort each row and drop duplicates in place
+    offsets = array("i", [0])
+    size = 0
+    for i in range(num_rows):
+        previous = -1
+        for col in sorted(indices[counts[i]:counts[i + 1]]):
+            if col != previous:
+                indices[size] = col
+                size += 1
+                previous = col
+        offsets.append(size)
+    del indices[size:]
+    return offsets, indices
+
+
+def load_data(directory, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    If `use_snapshot` is set, a snapshot that still matches the CSV files
+    is memory-mapped instead, and a fresh one is written after parsing.
     """
+    global graph, _name_index
+    with _cache_lock:
+        _distance_cache.clear()
+        _recent_sources.clear()
+    _name_index = None
+    if use_snapshot and read_snapshot(directory):
+        return
+
+    person_ids = []
+    person_index = {}
+    movie_ids = []
+    movie_index = {}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
+            person_index[row["id"]] = len(person_ids)
+            person_ids.append(row["id"])
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
             else:
@@ -37,31 +166,282 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
+            movie_index[row["id"]] = len(movie_ids)
+            movie_ids.append(row["id"])
 
-    # Load stars
+    # Load stars as parallel arrays of person and movie indices
+    star_people = array("i")
+    star_movies = array("i")
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                person = person_index[row["person_id"]]
+                movie = movie_index[row["movie_id"]]
             except KeyError:
-                pass
+                continue
+            star_people.append(person)
+            star_movies.append(movie)
+
+    person_offsets, person_movies = build_csr(len(person_ids), star_people, star_movies)
+    movie_offsets, movie_stars = build_csr(len(movie_ids), star_movies, star_people)
+    graph = Graph(person_ids, movie_ids, person_offsets, person_movies,
+                  movie_offsets, movie_stars, person_index, movie_index)
+    _name_index = NameIndex(names)
+
+    if use_snapshot:
+        write_snapshot(directory)
+
+
+def csv_signature(directory):
+    """
+    Returns the (mtime_ns, size) of each CSV file, used to tell
+    whether a snapshot is still up to date.
+    """
+    signature = {}
+    for filename in CSV_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        signature[filename] = [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+
+def write_snapshot(directory):
+    """
+    Writes the loaded names, ids, metadata, adjacency arrays and name
+    index to SNAPSHOT_FILE in `directory`.
+
+    Layout: magic, version and header length, a JSON header describing
+    the sections, then each section 8-byte aligned. Integer sections are
+    native int32 arrays, string sections are NUL-separated UTF-8.
+    Returns False if the snapshot could not be written.
+    """
+    index = get_name_index()
+    sorted_names = index.names
+    name_offsets = array("i", [0])
+    name_people = array("i")
+    for name in sorted_names:
+        name_people.extend(sorted(graph.person_index[person_id] for person_id in names[name]))
+        name_offsets.append(len(name_people))
+
+    # Trigram postings as one array, sliced by trigram like name_people
+    trigram_keys = sorted(index.trigrams)
+    trigram_offsets = array("i", [0])
+    trigram_names = array("i")
+    for trigram in trigram_keys:
+        trigram_names.extend(index.trigrams[trigram])
+        trigram_offsets.append(len(trigram_names))
+
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+    sections = {
+        "person_ids": person_ids,
+        "person_names": [people[person_id]["name"] for person_id in person_ids],
+        "person_births": [people[person_id]["birth"] for person_id in person_ids],
+        "movie_ids": movie_ids,
+        "movie_titles": [movies[movie_id]["title"] for movie_id in movie_ids],
+        "movie_years": [movies[movie_id]["year"] for movie_id in movie_ids],
+        "names": sorted_names,
+        "name_offsets": name_offsets,
+        "name_people": name_people,
+        "trigram_keys": trigram_keys,
+        "trigram_offsets": trigram_offsets,
+        "trigram_names": trigram_names,
+        "person_offsets": graph.person_offsets,
+        "person_movies": graph.person_movies,
+        "movie_offsets": graph.movie_offsets,
+        "movie_stars": graph.movie_stars,
+    }
+
+    blobs = []
+    layout = {}
+    offset = 0
+    for name, values in sections.items():
+        if isinstance(values, list):
+            blob = "\0".join(values).encode("utf-8")
+            kind = "s"
+        else:
+            blob = bytes(array("i", values))
+            kind = "i"
+        layout[name] = [offset, len(blob), kind, len(values)]
+        padding = -len(blob) % 8
+        blobs.append(blob + bytes(padding))
+        offset += len(blob) + padding
+
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "sources": csv_signature(directory),
+        "sections": layout,
+    }).encode("utf-8")
+    header += b" " * (-(len(SNAPSHOT_MAGIC) + 8 + len(header)) % 8)
+
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(SNAPSHOT_VERSION.to_bytes(4, "little"))
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def read_snapshot(directory):
+    """
+    Memory-maps the snapshot in `directory` and fills the globals from it.
+
+    The adjacency arrays stay views into the mapping, so they cost no
+    private memory and are shared through the page cache. Returns False,
+    leaving the globals untouched, if there is no snapshot or it is
+    stale, from another version, or unreadable.
+    """
+    global graph, _name_index, _snapshot_map
+    try:
+        with open(os.path.join(directory, SNAPSHOT_FILE), "rb") as f:
+            snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return False
+
+    try:
+        start = len(SNAPSHOT_MAGIC) + 8
+        if snapshot[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            return False
+        version = int.from_bytes(snapshot[len(SNAPSHOT_MAGIC):len(SNAPSHOT_MAGIC) + 4], "little")
+        header_size = int.from_bytes(snapshot[len(SNAPSHOT_MAGIC) + 4:start], "little")
+        if version != SNAPSHOT_VERSION:
+            return False
+        header = json.loads(snapshot[start:start + header_size])
+        if header["byteorder"] != sys.byteorder or header["sources"] != csv_signature(directory):
+            return False
+    except (OSError, ValueError, KeyError, TypeError):
+        return False
+
+    # Check every section against the file before filling anything, so
+    # a truncated or corrupt snapshot falls back to the CSV files
+    data = memoryview(snapshot)[start + header_size:]
+    try:
+        sections = {}
+        for name, (offset, size, kind, count) in header["sections"].items():
+            if offset < 0 or size < 0 or offset + size > len(data):
+                return False
+            if kind == "i":
+                if size != 4 * count:
+                    return False
+                sections[name] = data[offset:offset + size].cast("i")
+            elif count == 0:
+                sections[name] = []
+            else:
+                sections[name] = bytes(data[offset:offset + size]).decode("utf-8").split("\0")
+                if len(sections[name]) != count:
+                    return False
+
+        person_ids = sections["person_ids"]
+        movie_ids = sections["movie_ids"]
+        lengths = {
+            "person_names": len(person_ids),
+            "person_births": len(person_ids),
+            "person_offsets": len(person_ids) + 1,
+            "movie_titles": len(movie_ids),
+            "movie_years": len(movie_ids),
+            "movie_offsets": len(movie_ids) + 1,
+            "name_offsets": len(sections["names"]) + 1,
+            "trigram_offsets": len(sections["trigram_keys"]) + 1,
+        }
+        if any(len(sections[name]) != length for name, length in lengths.items()):
+            return False
+        for offsets, indices in [("person_offsets", "person_movies"), ("movie_offsets", "movie_stars"),
+                                 ("name_offsets", "name_people"), ("trigram_offsets", "trigram_names")]:
+            if sections[offsets][-1] != len(sections[indices]):
+                return False
+
+        snapshot_people = {
+            person_id: {"name": name, "birth": birth}
+            for person_id, name, birth in zip(person_ids, sections["person_names"], sections["person_births"])
+        }
+        snapshot_movies = {
+            movie_id: {"title": title, "year": year}
+            for movie_id, title, year in zip(movie_ids, sections["movie_titles"], sections["movie_years"])
+        }
+        name_offsets = sections["name_offsets"]
+        name_people = sections["name_people"]
+        snapshot_names = {
+            name: {person_ids[p] for p in name_people[name_offsets[i]:name_offsets[i + 1]]}
+            for i, name in enumerate(sections["names"])
+        }
+        trigram_offsets = sections["trigram_offsets"]
+        trigram_names = sections["trigram_names"]
+        postings = {
+            trigram: trigram_names[trigram_offsets[i]:trigram_offsets[i + 1]]
+            for i, trigram in enumerate(sections["trigram_keys"])
+        }
+    except (TypeError, IndexError, ValueError, KeyError):
+        return False
+
+    people.update(snapshot_people)
+    movies.update(snapshot_movies)
+    names.update(snapshot_names)
+    graph = Graph(person_ids, movie_ids, sections["person_offsets"], sections["person_movies"],
+                  sections["movie_offsets"], sections["movie_stars"])
+    _name_index = NameIndex(sections["names"], postings)
+    _snapshot_map = snapshot
+    return True
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Find degrees of separation between two actors.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--search", choices=["bfs", "bidirectional"], default="bidirectional")
+    parser.add_argument("--no-snapshot", action="store_true",
+                        help="always parse the CSV files and do not write a snapshot")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="answer tab-separated name or id pairs from FILE (default stdin) as JSON lines")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="processes used by --batch")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="answer GET /path?source=..&target=.. on localhost")
+    parser.add_argument("--histogram", action="store_true",
+                        help="print how many people are at each distance from one person")
+    args = parser.parse_args()
+    directory = args.directory
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
-    
+    # (status goes to stderr when stdout carries JSON)
+    status = sys.stdout if args.batch is None and args.serve is None else sys.stderr
+    print("Loading data...", file=status)
+    load_data(directory, use_snapshot=not args.no_snapshot)
+    print("Data loaded.", file=status)
+
+    if args.batch is not None:
+        if args.batch == "-":
+            run_batch(sys.stdin, sys.stdout, args.search, args.workers)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(f, sys.stdout, args.search, args.workers)
+        return
+    if args.serve is not None:
+        serve(args.serve, args.search)
+        return
+
+    if args.histogram:
+        source = person_id_for_name(input("Name: "))
+        if source is None:
+            sys.exit("Person not found.")
+        histogram = distances_from(source).histogram()
+        for distance in sorted(histogram, key=lambda d: (d is None, d)):
+            label = "not connected" if distance is None else f"{distance} degrees"
+            print(f"{label}: {histogram[distance]}")
+        return
+
     source = person_id_for_name(input("Name: "))
     if source is None:
         sys.exit("Person not found.")
@@ -69,7 +449,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = find_path(source, target, args.search)
 
     if path is None:
         print("Not connected.")
@@ -84,6 +464,154 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
+def find_path(source, target, search="bidirectional"):
+    """
+    Returns the path between two person_ids using the named search.
+    With the bidirectional search, a source that keeps coming back gets
+    a cached single-source search, which answers its later queries
+    directly. "bfs" always runs the reference search.
+    """
+    if search == "bfs":
+        return shortest_path(source, target)
+
+    with _cache_lock:
+        cached = _distance_cache.get(source)
+        if cached is not None:
+            _distance_cache.move_to_end(source)
+        _recent_sources.append(source)
+        hot = cached is None and _recent_sources.count(source) >= HOT_QUERIES
+    if cached is not None:
+        return cached.path_to(target)
+    if hot:
+        return distances_from(source).path_to(target)
+    return shortest_path_bidirectional(source, target)
+
+
+def resolve_person(text):
+    """
+    Non-interactive version of `person_id_for_name` for batch and server
+    queries. `text` may be a person_id or a name.
+
+    Returns (person_id, None), or (None, error message) if the name is
+    unknown or matches several people.
+    """
+    text = text.strip()
+    if text in people:
+        return text, None
+    person_ids = names.get(text.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids)), None
+    if not person_ids:
+        suggestions = [people[person_id]["name"] for person_id in suggest_people(text, limit=3)]
+        if suggestions:
+            return None, f"person not found: {text} (did you mean {', '.join(suggestions)}?)"
+        return None, f"person not found: {text}"
+    return None, f"ambiguous name: {text} (ids {', '.join(sorted(person_ids))})"
+
+
+def answer_query(source_text, target_text, search="bidirectional"):
+    """
+    Answers one source/target query as a JSON-serialisable dict with
+    the degrees of separation and the path, or an error message.
+    """
+    answer = {"source": source_text, "target": target_text}
+    source, error = resolve_person(source_text)
+    if error is None:
+        target, error = resolve_person(target_text)
+    if error is not None:
+        answer["error"] = error
+        return answer
+
+    path = find_path(source, target, search)
+    if path is None:
+        answer["degrees"] = None
+        answer["path"] = None
+    else:
+        answer["degrees"] = len(path)
+        answer["path"] = [
+            {"movie_id": movie_id, "title": movies[movie_id]["title"],
+             "person_id": person_id, "name": people[person_id]["name"]}
+            for movie_id, person_id in path
+        ]
+    return answer
+
+
+def _answer_line(args):
+    """
+    Pool worker: answers one batch line. The graph is inherited from the
+    parent process through fork, so workers never load data themselves.
+    """
+    line, search = args
+    fields = line.rstrip("\n").split("\t")
+    if len(fields) != 2:
+        return json.dumps({"line": line.rstrip("\n"), "error": "expected two tab-separated fields"})
+    return json.dumps(answer_query(fields[0], fields[1], search))
+
+
+def run_batch(lines, output, search="bidirectional", workers=None):
+    """
+    Answers every `source<TAB>target` line of `lines` and streams one JSON
+    object per line to `output`, in input order.
+
+    Queries run on a pool of forked processes that share the already
+    loaded graph (and the snapshot mapping) copy-on-write. Where fork
+    is not available the queries run in this process.
+    """
+    queries = ((line, search) for line in lines if line.strip())
+    if (workers is not None and workers <= 1) or "fork" not in multiprocessing.get_all_start_methods():
+        for result in map(_answer_line, queries):
+            print(result, file=output, flush=True)
+        return
+
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        for result in pool.imap(_answer_line, queries, chunksize=16):
+            print(result, file=output, flush=True)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Serves `GET /path?source=...&target=...` from the loaded graph.
+    """
+
+    search = "bidirectional"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path != "/path" or "source" not in query or "target" not in query:
+            self.send_json(400, {"error": "usage: /path?source=NAME_OR_ID&target=NAME_OR_ID"})
+            return
+        answer = answer_query(query["source"][0], query["target"][0], self.search)
+        self.send_json(404 if "error" in answer else 200, answer)
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, search="bidirectional"):
+    """
+    Keeps the loaded graph warm and answers queries over HTTP on
+    localhost until interrupted.
+    """
+    QueryHandler.search = search
+    server = ThreadingHTTPServer(("127.0.0.1", port), QueryHandler)
+    print(f"Serving on http://127.0.0.1:{server.server_address[1]}/path", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
 def shortest_path(source, target):
     """
     Returns the shortest list of (movie_id, person_id) pairs
@@ -103,7 +631,7 @@ def shortest_path(source, target):
 
     while True:
         if frontier.empty():
-            raise Exception("no solution")
+            return None
 
         node = frontier.remove()
         num_explored += 1
@@ -131,6 +659,192 @@ def shortest_path(source, target):
                 frontier.add(child)
 
 
+def shortest_path_bidirectional(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching breadth-first
+    from both ends at once until the two searches meet.
+
+    Same result format as `shortest_path`, which is kept as the
+    reference implementation. If no possible path, returns None.
+    """
+    if source == target:
+        return []
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+
+    # parents on the source side map person -> (movie, previous person),
+    # parents on the target side map person -> (movie, next person).
+    # The dicts double as the explored sets, so membership tests are O(1)
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = deque([source])
+    backward_frontier = deque([target])
+
+    while forward_frontier and backward_frontier:
+
+        # Always expand one whole level of the smaller frontier
+        if len(forward_frontier) <= len(backward_frontier):
+            meeting = expand_level(forward_frontier, forward, backward)
+            if meeting is not None:
+                person, movie, other = meeting
+                return join_paths(forward, backward, person, movie, other)
+        else:
+            meeting = expand_level(backward_frontier, backward, forward)
+            if meeting is not None:
+                person, movie, other = meeting
+                return join_paths(forward, backward, other, movie, person)
+
+    return None
+
+
+def expand_level(frontier, parents, other_parents):
+    """
+    Expands every person index currently in `frontier` by one step.
+
+    Returns (person, movie, neighbor) indices for the first edge that
+    reaches a person already seen by the other search, None otherwise.
+    Since the two explored sets were disjoint before this level, the
+    first meeting found is on a shortest path.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+    for _ in range(len(frontier)):
+        person = frontier.popleft()
+        for k in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[k]
+            for l in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbor = movie_stars[l]
+                if neighbor in parents:
+                    continue
+                if neighbor in other_parents:
+                    return person, movie, neighbor
+                parents[neighbor] = (movie, person)
+                frontier.append(neighbor)
+    return None
+
+
+def join_paths(forward, backward, left, movie, right):
+    """
+    Builds the (movie_id, person_id) path from the two parent maps of a
+    bidirectional search that met on the edge left --movie-- right.
+    """
+    path = []
+    person = left
+    while forward[person] is not None:
+        movie_before, previous = forward[person]
+        path.append((movie_before, person))
+        person = previous
+    path.reverse()
+
+    path.append((movie, right))
+    person = right
+    while backward[person] is not None:
+        movie_after, following = backward[person]
+        path.append((movie_after, following))
+        person = following
+    return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+
+class SingleSource():
+    """
+    Result of a breadth-first search from one person to everyone.
+
+    `distance[p]` is the number of degrees from the source to person
+    index p (-1 if not connected), and `parent_person[p]` /
+    `parent_movie[p]` is the step taken to reach p on a shortest path.
+    """
+
+    def __init__(self, source, distance, parent_person, parent_movie):
+        self.source = source
+        self.distance = distance
+        self.parent_person = parent_person
+        self.parent_movie = parent_movie
+
+    def distance_to(self, person_id):
+        """
+        Returns the degrees of separation to a person_id, or None.
+        """
+        distance = self.distance[graph.person_index[person_id]]
+        return None if distance < 0 else distance
+
+    def path_to(self, person_id):
+        """
+        Returns the (movie_id, person_id) path from the source to
+        person_id in O(path length), or None if they are not connected.
+        """
+        person = graph.person_index[person_id]
+        if self.distance[person] < 0:
+            return None
+        path = []
+        while self.parent_person[person] >= 0:
+            path.append((graph.movie_ids[self.parent_movie[person]], graph.person_ids[person]))
+            person = self.parent_person[person]
+        path.reverse()
+        return path
+
+    def histogram(self):
+        """
+        Returns a dict mapping each distance to the number of people at
+        that distance, with people not connected counted under None.
+        """
+        histogram = {}
+        for distance in self.distance:
+            key = None if distance < 0 else distance
+            histogram[key] = histogram.get(key, 0) + 1
+        return histogram
+
+
+def distances_from(source):
+    """
+    Runs a breadth-first search from the source person_id over the whole
+    graph and returns a SingleSource. Results for the most recently used
+    sources are cached, so repeated queries from a hub are free.
+    """
+    with _cache_lock:
+        if source in _distance_cache:
+            _distance_cache.move_to_end(source)
+            return _distance_cache[source]
+
+    num_people = len(graph.person_ids)
+    distance = array("i", [-1]) * num_people
+    parent_person = array("i", [-1]) * num_people
+    parent_movie = array("i", [-1]) * num_people
+
+    # A movie only needs expanding once: all its stars are reached then
+    movie_seen = bytearray(len(graph.movie_ids))
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    start = graph.person_index[source]
+    distance[start] = 0
+    frontier = deque([start])
+    while frontier:
+        person = frontier.popleft()
+        next_distance = distance[person] + 1
+        for k in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[k]
+            if movie_seen[movie]:
+                continue
+            movie_seen[movie] = 1
+            for l in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                neighbor = movie_stars[l]
+                if distance[neighbor] < 0:
+                    distance[neighbor] = next_distance
+                    parent_person[neighbor] = person
+                    parent_movie[neighbor] = movie
+                    frontier.append(neighbor)
+
+    result = SingleSource(source, distance, parent_person, parent_movie)
+    with _cache_lock:
+        _distance_cache[source] = result
+        if len(_distance_cache) > DISTANCE_CACHE_SIZE:
+            _distance_cache.popitem(last=False)
+    return result
 
 
 def person_id_for_name(name):
@@ -140,6 +854,19 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        person_ids = suggest_people(name)
+        if not person_ids:
+            return None
+        print(f"No exact match for '{name}'. Did you mean:")
+        for person_id in person_ids:
+            person = people[person_id]
+            print(f"ID: {person_id}, Name: {person['name']}, Birth: {person['birth']}")
+        try:
+            person_id = input("Intended Person ID: ")
+            if person_id in person_ids:
+                return person_id
+        except ValueError:
+            pass
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -159,16 +886,125 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+class NameIndex():
+    """
+    Prefix and fuzzy lookup over the lowercase names in `names`.
+
+    Prefix queries bisect a sorted list of names. Fuzzy queries collect
+    names sharing trigrams with the query and rank them by edit distance.
+    Prebuilt `postings` (trigram -> sorted name positions) skip the scan.
+    """
+
+    # How many candidate names are scored per query
+    CANDIDATES = 200
+
+    # Trigrams shared by more names than this (" jo", "son") are too
+    # common to narrow the search and are skipped when rarer ones exist
+    MAX_POSTINGS = 20000
+
+    def __init__(self, all_names, postings=None):
+        self.names = sorted(all_names)
+        if postings is None:
+            postings = {}
+            for i, name in enumerate(self.names):
+                for trigram in trigrams(name):
+                    postings.setdefault(trigram, array("i")).append(i)
+        self.trigrams = postings
+
+    def with_prefix(self, prefix, limit=None):
+        """
+        Returns the names starting with `prefix`, in sorted order.
+        """
+        start = bisect.bisect_left(self.names, prefix)
+        end = bisect.bisect_left(self.names, prefix + "\uffff", lo=start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return self.names[start:end]
+
+    def similar(self, query):
+        """
+        Returns (edit distance, name) pairs for names that share the
+        most trigrams with `query`, closest first.
+        """
+        postings = sorted((self.trigrams[trigram] for trigram in trigrams(query)
+                           if trigram in self.trigrams), key=len)
+        rare = [posting for posting in postings if len(posting) <= self.MAX_POSTINGS]
+        shared = {}
+        for posting in rare or postings[:2]:
+            for i in posting:
+                shared[i] = shared.get(i, 0) + 1
+        best = heapq.nlargest(self.CANDIDATES, shared, key=shared.get)
+        return sorted((edit_distance(query, self.names[i]), self.names[i]) for i in best)
+
+
+def trigrams(name):
+    """
+    Returns the set of 3-character substrings of a padded name.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    """
+    Returns the Levenshtein distance between two strings.
+    """
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def get_name_index():
+    """
+    Returns the NameIndex for the loaded data, building it if the
+    names were filled in without load_data.
+    """
+    global _name_index
+    if _name_index is None:
+        _name_index = NameIndex(names)
+    return _name_index
+
+
+def suggest_people(text, limit=10):
+    """
+    Returns up to `limit` person_ids whose names start with or are close
+    to `text`, ranked by closeness and then by number of movies.
+    """
+    query = text.strip().lower()
+    if not query:
+        return []
+    index = get_name_index()
+    distances = {name: 0 for name in index.with_prefix(query, NameIndex.CANDIDATES)}
+    for distance, name in index.similar(query):
+        distances.setdefault(name, distance)
+
+    def films(person_id):
+        person = graph.person_index[person_id]
+        return graph.person_offsets[person + 1] - graph.person_offsets[person]
+
+    ranked = sorted(
+        (distance, name != query, -films(person_id), name, person_id)
+        for name, distance in distances.items()
+        for person_id in names[name]
+    )
+    return [ranking[-1] for ranking in ranked[:limit]]
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie in graph.movies_of(graph.person_index[person_id]):
+        movie_id = graph.movie_ids[movie]
+        for person in graph.stars_of(movie):
+            neighbors.add((movie_id, graph.person_ids[person]))
     return neighbors
 
     
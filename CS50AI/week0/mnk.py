@@ -0,0 +1,354 @@
+"""
+m,n,k game player
+
+Generalizes Tic Tac Toe to an m x n board where k marks in a row win
+(3,3,3 is Tic Tac Toe, 15,15,5 is gomoku). Exhaustive minimax does not
+scale past 3x3, so moves are chosen by iterative-deepening alpha-beta
+within a time budget, using a heuristic evaluation when the search is
+cut off and a Zobrist-hashed transposition table.
+
+Boards are the same lists of lists of X, O and EMPTY as tictactoe.py;
+tictactoe.minimax remains the exact 3x3 player.
+"""
+
+import math
+import random
+import sys
+import time
+
+from tictactoe import X, EMPTY, player
+
+# Score of a won position, minus the number of plies it takes to get there
+WIN = 10 ** 9
+
+# Candidate moves are empty cells within this distance of a mark
+RADIUS = 2
+
+# Transposition table flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Engine():
+    """
+    Searches positions of one m,n,k game.
+
+    Cells are flattened to i * n + j and hold 0 (empty), 1 (X) or 2 (O).
+    The engine keeps, for every k-cell line ("window"), how many marks
+    each player has in it, so placing a mark updates the evaluation, the
+    win check and the Zobrist hash incrementally.
+    """
+
+    def __init__(self, m, n, k, seed=0):
+        if k > max(m, n):
+            raise ValueError("k must fit on the board")
+        self.m = m
+        self.n = n
+        self.k = k
+        size = m * n
+
+        # Every window of k cells, and the windows through each cell
+        self.windows = []
+        self.cell_windows = [[] for _ in range(size)]
+        for i in range(m):
+            for j in range(n):
+                for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    if 0 <= i + (k - 1) * di < m and 0 <= j + (k - 1) * dj < n:
+                        window = [(i + t * di) * n + j + t * dj for t in range(k)]
+                        for cell in window:
+                            self.cell_windows[cell].append(len(self.windows))
+                        self.windows.append(window)
+
+        # Cells within RADIUS of each cell, for generating candidate moves
+        self.nearby = [
+            [r * n + c
+             for r in range(max(0, i - RADIUS), min(m, i + RADIUS + 1))
+             for c in range(max(0, j - RADIUS), min(n, j + RADIUS + 1))
+             if (r, c) != (i, j)]
+            for i in range(m) for j in range(n)
+        ]
+
+        # Value of a window holding only one player's marks, by mark count.
+        # The base shrinks for long lines and each weight is capped, so no
+        # sum of heuristic scores comes near a WIN score
+        cap = WIN // 2 // (len(self.windows) + 1)
+        base = 10
+        while base > 2 and base ** k > cap:
+            base -= 1
+        self.weights = [0] + [min(base ** count, cap) for count in range(1, k + 1)]
+
+        rng = random.Random(seed)
+        self.zobrist = [[0, rng.getrandbits(64), rng.getrandbits(64)] for _ in range(size)]
+        self.o_to_move = rng.getrandbits(64)
+        self.table = {}
+        self.load([[EMPTY] * n for _ in range(m)])
+
+    def load(self, board):
+        """
+        Sets up the engine's position from a list-of-lists board.
+        """
+        size = self.m * self.n
+        self.cells = [0] * size
+        self.near = [0] * size
+        self.counts = [[0, 0, 0] for _ in self.windows]
+        self.filled = 0
+        self.score = 0
+        self.hash = 0
+        for i, row in enumerate(board):
+            for j, mark in enumerate(row):
+                if mark != EMPTY:
+                    self.place(i * self.n + j, 1 if mark == X else 2)
+
+    def value_of(self, counts):
+        """
+        Returns a window's contribution to the evaluation, from X's side.
+        """
+        if counts[1] and counts[2]:
+            return 0
+        return self.weights[counts[1]] - self.weights[counts[2]]
+
+    def place(self, cell, side):
+        """
+        Puts side's mark on cell. Returns True if that completed k in a row.
+        """
+        self.cells[cell] = side
+        self.filled += 1
+        self.hash ^= self.zobrist[cell][side]
+        for other in self.nearby[cell]:
+            self.near[other] += 1
+        won = False
+        for w in self.cell_windows[cell]:
+            counts = self.counts[w]
+            before = self.value_of(counts)
+            counts[side] += 1
+            if counts[side] == self.k:
+                won = True
+            self.score += self.value_of(counts) - before
+        return won
+
+    def remove(self, cell, side):
+        """
+        Takes side's mark back off cell.
+        """
+        self.cells[cell] = 0
+        self.filled -= 1
+        self.hash ^= self.zobrist[cell][side]
+        for other in self.nearby[cell]:
+            self.near[other] -= 1
+        for w in self.cell_windows[cell]:
+            counts = self.counts[w]
+            before = self.value_of(counts)
+            counts[side] -= 1
+            self.score += self.value_of(counts) - before
+
+    def ordered_moves(self, side, first=None):
+        """
+        Returns candidate cells for side, most promising first: the
+        transposition table's move, then cells that extend side's own
+        lines or block the opponent's.
+        """
+        if self.filled == 0:
+            return [(self.m // 2) * self.n + self.n // 2]
+        opponent = 3 - side
+        weights = self.weights
+        scored = []
+        for cell in range(len(self.cells)):
+            if self.cells[cell] or not self.near[cell]:
+                continue
+            priority = 0
+            for w in self.cell_windows[cell]:
+                counts = self.counts[w]
+                if not counts[opponent]:
+                    priority += weights[counts[side] + 1]
+                if not counts[side]:
+                    priority += weights[counts[opponent] + 1]
+            scored.append((-priority, cell))
+        scored.sort()
+        moves = [cell for _, cell in scored]
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
+
+    def negamax(self, depth, alpha, beta, side, ply):
+        """
+        Returns the value of the position for side to move, searching
+        `depth` plies with alpha-beta pruning.
+        """
+        self.nodes += 1
+        if self.nodes % 512 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout
+        if self.filled == len(self.cells):
+            return 0
+        if depth == 0:
+            return self.score if side == 1 else -self.score
+
+        key = self.hash ^ self.o_to_move if side == 2 else self.hash
+        entry = self.table.get(key)
+        first = None
+        if entry is not None:
+            entry_depth, value, flag, first = entry
+            value = self.from_table(value, ply)
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+        alpha_start = alpha
+
+        best = -math.inf
+        best_move = None
+        for cell in self.ordered_moves(side, first):
+            if self.place(cell, side):
+                value = WIN - ply
+            else:
+                value = -self.negamax(depth - 1, -beta, -alpha, 3 - side, ply + 1)
+            self.remove(cell, side)
+            if value > best:
+                best, best_move = value, cell
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        if best <= alpha_start:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, self.to_table(best, ply), flag, best_move)
+        return best
+
+    def to_table(self, value, ply):
+        """
+        Returns `value`, found `ply` plies below the root, as stored in
+        the transposition table: win scores count plies from the stored
+        position rather than from the root, so they stay correct when
+        the position is reached at another ply or in a later search.
+        """
+        if value >= WIN - len(self.cells):
+            return value + ply
+        if value <= -(WIN - len(self.cells)):
+            return value - ply
+        return value
+
+    def from_table(self, value, ply):
+        """
+        Returns a value stored in the transposition table as a score for
+        the position `ply` plies below the root, undoing to_table.
+        """
+        if value >= WIN - len(self.cells):
+            return value - ply
+        if value <= -(WIN - len(self.cells)):
+            return value + ply
+        return value
+
+    def search(self, board, time_limit=1.0, max_depth=None):
+        """
+        Returns (action, value, depth): the best (i, j) action for the
+        player to move found within `time_limit` seconds, its value for
+        that player and the deepest fully searched depth.
+        """
+        self.load(board)
+        side = 1 if player(board) == X else 2
+        remaining = len(self.cells) - self.filled
+        if max_depth is None:
+            max_depth = remaining
+
+        self.deadline = time.perf_counter() + time_limit
+        self.nodes = 0
+        key = self.hash ^ self.o_to_move if side == 2 else self.hash
+        move = self.ordered_moves(side)[0]
+        value = None
+        depth = 0
+        for target in range(1, max_depth + 1):
+            try:
+                value = self.negamax(target, -math.inf, math.inf, side, 0)
+            except SearchTimeout:
+                break
+            move = self.table[key][3]
+            depth = target
+            if abs(value) >= WIN - remaining:
+                break
+        return divmod(move, self.n), value, depth
+
+
+def initial_state(m, n):
+    """
+    Returns an empty m x n board.
+    """
+    return [[EMPTY] * n for _ in range(m)]
+
+
+def winner(board, k):
+    """
+    Returns the player with k marks in a row on the board, if there is one.
+    """
+    m, n = len(board), len(board[0])
+    for i in range(m):
+        for j in range(n):
+            mark = board[i][j]
+            if mark == EMPTY:
+                continue
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                if all(0 <= i + t * di < m and 0 <= j + t * dj < n
+                       and board[i + t * di][j + t * dj] == mark for t in range(k)):
+                    return mark
+    return None
+
+
+def terminal(board, k):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return winner(board, k) is not None or all(mark != EMPTY for row in board for mark in row)
+
+
+# One engine per board shape, so the transposition table is reused between moves
+_engines = {}
+
+
+def best_move(board, k, time_limit=1.0):
+    """
+    Returns the action (i, j) for the current player on an m x n board
+    where k in a row wins, searching for at most `time_limit` seconds.
+    """
+    if terminal(board, k):
+        return None
+    m, n = len(board), len(board[0])
+    if (m, n, k) not in _engines:
+        _engines[(m, n, k)] = Engine(m, n, k)
+    action, _, _ = _engines[(m, n, k)].search(board, time_limit)
+    return action
+
+
+def main():
+    if len(sys.argv) not in [4, 5]:
+        sys.exit("Usage: python mnk.py m n k [seconds per move]")
+    m, n, k = (int(arg) for arg in sys.argv[1:4])
+    time_limit = float(sys.argv[4]) if len(sys.argv) == 5 else 1.0
+
+    # Let the engine play itself
+    engine = Engine(m, n, k)
+    board = initial_state(m, n)
+    while not terminal(board, k):
+        turn = player(board)
+        start = time.perf_counter()
+        (i, j), value, depth = engine.search(board, time_limit)
+        elapsed = time.perf_counter() - start
+        board[i][j] = turn
+        print(f"{turn} plays ({i}, {j}), depth {depth}, value {value}, {elapsed:.2f}s")
+    for row in board:
+        print(" ".join(mark or "." for mark in row))
+    print(f"Winner: {winner(board, k) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,38 @@
 Tic Tac Toe Player
 """
 
-import copy, math
+import math
+import os
+import sys
 
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Every line of three cells, as indices into a flattened board
+LINES = [
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6)
+]
+
+# The 8 rotations and reflections of the board, as index permutations:
+# cell k of the transformed board is cell SYMMETRIES[t][k] of the original
+SYMMETRIES = [
+    tuple(
+        3 * (2 - r if flip_rows else r) + (2 - c if flip_cols else c)
+        for i in range(3) for j in range(3)
+        for r, c in [(j, i) if transpose else (i, j)]
+    )
+    for transpose in (False, True)
+    for flip_rows in (False, True)
+    for flip_cols in (False, True)
+]
+
+# Search center first, then corners, then edges, so cutoffs come early
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
 
 def initial_state():
     """
@@ -54,13 +79,12 @@ def result(board, action):
     Returns the board that results from making move (i, j) on the board.
     """
 
-    status = copy.deepcopy(board)
-    if action not in actions(board):
+    row, col = action
+    if not (0 <= row < len(board) and 0 <= col < len(board[0])) or board[row][col] != EMPTY:
         raise Exception("Invalid action")
-    else:
-        row, col = action
-        status[row][col] = player(board)
-        return status
+    status = [list(r) for r in board]
+    status[row][col] = player(board)
+    return status
 
 
 def winner(board):
@@ -88,7 +112,7 @@ def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) or not actions:
+    if winner(board) or not actions(board):
         return True
     else:
         return False
@@ -108,46 +132,259 @@ def utility(board):
             return 0
     
 
-def max_value(board):
-    if terminal(board):
-        return utility(board)
-    
-    v = -math.inf
-    for action in actions(board):
-        v = max(v, min_value(result(board, action)))
-        return v
+# Opening book of the optimal move in every reachable position, see load_book
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tictactoe.book")
+BOOK_MAGIC = b"TTTBOOK1"
+NO_ENTRY = 0xFF
+BASE3 = str.maketrans(".XO", "012")
+opening_book = None
+
+# Transposition table flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Maps canonical board encodings to (value, flag), shared by all searches
+transpositions = {}
+
+
+def encode(board):
+    """
+    Returns the board as a flat string of 9 characters ("X", "O" or ".").
+    """
+    return "".join(cell or "." for row in board for cell in row)
+
+
+def canonical(cells):
+    """
+    Returns the smallest encoding among the 8 symmetric versions of
+    the flat board `cells`, so symmetric positions share one entry.
+    """
+    return min("".join(cells[k] for k in permutation) for permutation in SYMMETRIES)
+
+
+def line_winner(cells):
+    """
+    Returns the winner of the flat board `cells`, if there is one.
+    """
+    for a, b, c in LINES:
+        if cells[a] != "." and cells[a] == cells[b] == cells[c]:
+            return cells[a]
+    return None
+
+
+def value(cells, alpha=-math.inf, beta=math.inf):
+    """
+    Returns the minimax value of the flat board `cells` (1 if X wins,
+    -1 if O wins, 0 for a draw), using alpha-beta pruning and the
+    transposition table.
+
+    Values outside (alpha, beta) are bounds: a result <= alpha means the
+    true value is at most that, a result >= beta means at least that.
+    """
+    won = line_winner(cells)
+    if won is not None:
+        return 1 if won == X else -1
+    empty = [k for k in MOVE_ORDER if cells[k] == "."]
+    if not empty:
+        return 0
+
+    key = canonical(cells)
+    entry = transpositions.get(key)
+    if entry is not None:
+        v, flag = entry
+        if flag == EXACT:
+            return v
+        if flag == LOWER:
+            alpha = max(alpha, v)
+        else:
+            beta = min(beta, v)
+        if alpha >= beta:
+            return v
+    alpha_start, beta_start = alpha, beta
+
+    turn = X if len(empty) % 2 == 1 else O
+    if turn == X:
+        v = -math.inf
+        for k in empty:
+            v = max(v, value(cells[:k] + X + cells[k + 1:], alpha, beta))
+            alpha = max(alpha, v)
+            if alpha >= beta:
+                break
+    else:
+        v = math.inf
+        for k in empty:
+            v = min(v, value(cells[:k] + O + cells[k + 1:], alpha, beta))
+            beta = min(beta, v)
+            if alpha >= beta:
+                break
+
+    if v <= alpha_start:
+        transpositions[key] = (v, UPPER)
+    elif v >= beta_start:
+        transpositions[key] = (v, LOWER)
+    else:
+        transpositions[key] = (v, EXACT)
+    return v
+
+
+def best_move(cells):
+    """
+    Returns (k, v): the optimal move for the player to move on the flat
+    board `cells`, as an index into it, and the resulting minimax value.
+    """
+    turn = X if cells.count(".") % 2 == 1 else O
+    move = None
+    best = -math.inf if turn == X else math.inf
+    for k in MOVE_ORDER:
+        if cells[k] != ".":
+            continue
+        child = cells[:k] + turn + cells[k + 1:]
+        if turn == X:
+            v = value(child, best, math.inf)
+            if v > best:
+                best, move = v, k
+            if best == 1:
+                break
+        else:
+            v = value(child, -math.inf, best)
+            if v < best:
+                best, move = v, k
+            if best == -1:
+                break
+    return move, best
+
+
+def canonical_form(cells):
+    """
+    Returns (canonical encoding, permutation), where cell k of the
+    canonical board is cell permutation[k] of `cells`.
+    """
+    return min(("".join(cells[k] for k in permutation), permutation)
+               for permutation in SYMMETRIES)
 
-def min_value(board):
-    if terminal(board):
-        return utility(board)
-    
-    v = math.inf
-    for action in actions(board):
-        v = min(v, max_value(result(board, action)))
-        return v
 
+def board_code(cells):
+    """
+    Returns the flat board `cells` read as a base-3 number, 0 to 3^9 - 1.
+    """
+    return int(cells.translate(BASE3), 3)
+
+
+def build_book():
+    """
+    Solves every reachable position up to symmetry and returns the book:
+    a bytearray indexed by board_code of the canonical position, holding
+    (value + 1) << 4 | move, or NO_ENTRY for positions that never occur
+    or are already over.
+    """
+    book = bytearray([NO_ENTRY]) * 3 ** 9
+    stack = ["." * 9]
+    seen = set(stack)
+    while stack:
+        cells = stack.pop()
+        if line_winner(cells) is not None or "." not in cells:
+            continue
+        k, v = best_move(cells)
+        book[board_code(cells)] = (v + 1) << 4 | k
+        turn = X if cells.count(".") % 2 == 1 else O
+        for k in range(9):
+            if cells[k] == ".":
+                child = canonical(cells[:k] + turn + cells[k + 1:])
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+    return book
+
+
+def load_book(path=BOOK_FILE):
+    """
+    Returns the opening book, reading it from `path` or building it and
+    saving it there (if writable) when it is missing or out of date.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:len(BOOK_MAGIC)] == BOOK_MAGIC and len(data) == len(BOOK_MAGIC) + 3 ** 9:
+            return bytearray(data[len(BOOK_MAGIC):])
+    except OSError:
+        pass
+
+    book = build_book()
+    try:
+        with open(path, "wb") as f:
+            f.write(BOOK_MAGIC + book)
+    except OSError:
+        pass
+    return book
 
 
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
     """
+    global opening_book
     if terminal(board):
         return None
+    if opening_book is None:
+        opening_book = load_book()
+
+    cells = encode(board)
+    canonical_cells, permutation = canonical_form(cells)
+    entry = opening_book[board_code(canonical_cells)]
+    if entry == NO_ENTRY:
+        # Not reachable in a real game, so search it directly
+        k, _ = best_move(cells)
+    else:
+        k = permutation[entry & 0xF]
+    return divmod(k, 3)
 
-    if player(board) == "X":
-        plays = []
-        if actions(board):
-            for action in actions(board):
-                plays.append((min_value(result(board, action)), action))
-            return sorted(plays, key=lambda x: x[0], reverse=True)[0][1]
 
+def check():
+    """
+    Verifies the book against a fresh search on every reachable position.
+    Returns the number of positions checked and the mismatches found.
+    """
+    transpositions.clear()
+    book = load_book()
+    checked = 0
+    mismatches = []
+    stack = [initial_state()]
+    seen = set()
+    while stack:
+        board = stack.pop()
+        cells = encode(board)
+        if cells in seen or terminal(board):
+            continue
+        seen.add(cells)
+        checked += 1
+
+        expected = value(cells)
+        action = minimax(board)
+        canonical_cells, _ = canonical_form(cells)
+        stored = (book[board_code(canonical_cells)] >> 4) - 1
+        if value(encode(result(board, action))) != expected or stored != expected:
+            mismatches.append(cells)
+        for action in actions(board):
+            stack.append(result(board, action))
+    return checked, mismatches
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in ["build", "check"]:
+        sys.exit("Usage: python tictactoe.py build|check")
+    if sys.argv[1] == "build":
+        try:
+            os.remove(BOOK_FILE)
+        except FileNotFoundError:
+            pass
+        load_book()
+        print(f"Wrote {BOOK_FILE}")
     else:
-        plays = []
-        if actions(board):
-            for action in actions(board):
-                plays.append((max_value(result(board, action)), action))
-            return sorted(plays, key=lambda x: x[0])[0][1]
+        checked, mismatches = check()
+        for cells in mismatches:
+            print(f"Mismatch: {cells}")
+        print(f"{checked} positions checked, {len(mismatches)} mismatches")
+        if mismatches:
+            sys.exit(1)
 
 
 '''
@@ -208,5 +445,5 @@ def min_value(board):
 '''
 
 
-
-    
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Random knights and knaves puzzles, and a benchmark of the entailment
+backends in puzzle.py on them.
+
+Usage: python benchmark.py [--characters N] [--statements M] [--count K]
+                           [--engines sat,truthtable,enumerate] [--seed S]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from logic import Symbol, Not, And, Or, Implication
+
+from puzzle import ENGINES, entailed_symbols
+
+
+def character_symbols(n):
+    """
+    Returns [(knight, knave), ...] symbols for n characters A, B, C, ...
+    """
+    characters = []
+    for i in range(n):
+        name = chr(ord("A") + i) if i < 26 else f"P{i}"
+        characters.append((Symbol(f"{name} is a Knight"), Symbol(f"{name} is a Knave")))
+    return characters
+
+
+def random_claim(characters, rng, depth=2):
+    """
+    Returns a random claim about the characters, such as "B is a knave"
+    or "A and C are of the same kind".
+    """
+    if depth == 0 or rng.random() < 0.4:
+        knight, knave = rng.choice(characters)
+        return rng.choice([knight, knave])
+    kind = rng.random()
+    if kind < 0.25:
+        return Not(random_claim(characters, rng, depth - 1))
+    if kind < 0.5:
+        return And(random_claim(characters, rng, depth - 1), random_claim(characters, rng, depth - 1))
+    if kind < 0.75:
+        return Or(random_claim(characters, rng, depth - 1), random_claim(characters, rng, depth - 1))
+    (a_knight, a_knave), (b_knight, b_knave) = rng.sample(characters, 2) if len(characters) > 1 else characters * 2
+    return Or(And(a_knight, b_knight), And(a_knave, b_knave))
+
+
+def generate_puzzle(n, m, rng=random):
+    """
+    Returns (knowledge, symbols) for a random puzzle with n characters
+    making m statements in total.
+    """
+    characters = character_symbols(n)
+    knowledge = And()
+    for knight, knave in characters:
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+    for _ in range(m):
+        knight, knave = rng.choice(characters)
+        claim = random_claim(characters, rng)
+        knowledge.add(Implication(knight, claim))
+        knowledge.add(Implication(knave, Not(claim)))
+    symbols = [symbol for pair in characters for symbol in pair]
+    return knowledge, symbols
+
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the value at `fraction` of the way through sorted_values.
+    """
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def run(engine, puzzles):
+    """
+    Solves every puzzle with the engine. Returns the answers and the
+    per-puzzle latencies in seconds.
+    """
+    answers = []
+    latencies = []
+    for knowledge, symbols in puzzles:
+        start = time.perf_counter()
+        answers.append(entailed_symbols(knowledge, symbols, engine))
+        latencies.append(time.perf_counter() - start)
+    return answers, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark entailment backends on random puzzles.")
+    parser.add_argument("--characters", type=int, default=3)
+    parser.add_argument("--statements", type=int, default=4)
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--engines", default=",".join(ENGINES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    engines = args.engines.split(",")
+    for engine in engines:
+        if engine not in ENGINES:
+            parser.error(f"unknown engine {engine}, expected one of {', '.join(ENGINES)}")
+
+    rng = random.Random(args.seed)
+    puzzles = [generate_puzzle(args.characters, args.statements, rng) for _ in range(args.count)]
+    print(f"{args.count} puzzles, {args.characters} characters, {args.statements} statements")
+    print(f"{'engine':>12} {'puzzles/s':>10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'peak KiB':>9}")
+
+    reference = None
+    for engine in engines:
+        answers, latencies = run(engine, puzzles)
+
+        # Memory is measured in a separate pass, tracing would skew the timings
+        tracemalloc.start()
+        run(engine, puzzles[:max(1, len(puzzles) // 10)])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies.sort()
+        print(f"{engine:>12} {len(puzzles) / sum(latencies):>10.1f} "
+              f"{percentile(latencies, 0.5) * 1000:>8.3f} {percentile(latencies, 0.9) * 1000:>8.3f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.3f} {peak / 1024:>9.1f}")
+
+        if reference is None:
+            reference = (engine, answers)
+        elif answers != reference[1]:
+            wrong = sum(a != b for a, b in zip(answers, reference[1]))
+            print(f"{engine:>12} disagrees with {reference[0]} on {wrong} puzzles")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import itertools
+import math
 import random
+import time
 
 
 class Minesweeper():
@@ -22,13 +24,23 @@ class Minesweeper():
                 row.append(False)
             self.board.append(row)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines randomly, drawing distinct cells in one go so the cost
+        # does not grow as the board fills up
+        for index in random.sample(range(height * width), mines):
+            i, j = divmod(index, width)
+            self.mines.add((i, j))
+            self.board[i][j] = True
+
+        # Count the mines around every cell once, by adding each mine to
+        # its neighbors, so nearby_mines is a lookup
+        self.counts = [[0] * width for _ in range(height)]
+        for i, j in self.mines:
+            for r in range(max(0, i - 1), min(height, i + 2)):
+                row = self.counts[r]
+                for c in range(max(0, j - 1), min(width, j + 2)):
+                    row[c] += 1
+        for i, j in self.mines:
+            self.counts[i][j] -= 1
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -59,23 +71,25 @@ class Minesweeper():
         not including the cell itself.
         """
 
-        # Keep count of nearby mines
-        count = 0
+        return self.counts[cell[0]][cell[1]]
 
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+    def reveal(self, cell):
+        """
+        Returns a dict mapping each cell uncovered by clicking a safe
+        `cell` to its nearby mine count. Cells with no nearby mines also
+        uncover all of their neighbors, flood-fill style.
+        """
+        revealed = {cell: self.counts[cell[0]][cell[1]]}
+        stack = [cell] if revealed[cell] == 0 else []
+        while stack:
+            i, j = stack.pop()
+            for r in range(max(0, i - 1), min(self.height, i + 2)):
+                for c in range(max(0, j - 1), min(self.width, j + 2)):
+                    if (r, c) not in revealed:
+                        revealed[(r, c)] = self.counts[r][c]
+                        if revealed[(r, c)] == 0:
+                            stack.append((r, c))
+        return revealed
 
     def won(self):
         """
@@ -139,18 +153,283 @@ class Sentence():
         if cell in self.cells:
             self.cells.remove(cell)
 
+    def is_empty(self):
+        return not self.cells
+
+    def key(self):
+        """
+        Returns a hashable value identifying the sentence's cells.
+        """
+        return frozenset(self.cells)
+
+    def is_proper_subset(self, other):
+        return self.cells < other.cells
+
+    def difference(self, other):
+        """
+        Returns the sentence for the cells of self not in other, given
+        that other's cells are a subset of self's.
+        """
+        return Sentence(self.cells - other.cells, self.count - other.count)
+
+
+class BitSentence():
+    """
+    Sentence stored as an int bitmask over the board, where cell (i, j)
+    is bit i * width + j, plus the count of mines among those cells.
+
+    Has the same methods as Sentence, but subset tests, differences and
+    marking cells are single integer operations.
+    """
+
+    __slots__ = ("mask", "count", "width")
+
+    def __init__(self, cells, count, width, mask=None):
+        if mask is None:
+            mask = 0
+            for i, j in cells:
+                mask |= 1 << (i * width + j)
+        self.mask = mask
+        self.count = count
+        self.width = width
+
+    @property
+    def cells(self):
+        """
+        The set of cells in the sentence, decoded from the mask.
+        """
+        cells = set()
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            cells.add(divmod(low.bit_length() - 1, self.width))
+            mask ^= low
+        return cells
+
+    def __eq__(self, other):
+        return self.mask == other.mask and self.count == other.count
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if self.count != 0 and bin(self.mask).count("1") == self.count:
+            return self.cells
+        return set()
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+        return set()
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        bit = 1 << (cell[0] * self.width + cell[1])
+        if self.mask & bit:
+            self.mask ^= bit
+            self.count -= 1
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        self.mask &= ~(1 << (cell[0] * self.width + cell[1]))
+
+    def is_empty(self):
+        return not self.mask
+
+    def key(self):
+        return self.mask
+
+    def is_proper_subset(self, other):
+        return self.mask != other.mask and self.mask & ~other.mask == 0
+
+    def difference(self, other):
+        return BitSentence(None, self.count - other.count, self.width, self.mask & ~other.mask)
+
+
+class OutOfTime(Exception):
+    pass
+
+
+def component_order(constraints):
+    """
+    Returns the cells of a component ordered so that cells sharing a
+    constraint are close together, which lets backtracking prune early.
+    """
+    by_cell = {}
+    for k, (cells, _) in enumerate(constraints):
+        for cell in cells:
+            by_cell.setdefault(cell, []).append(k)
+    order = []
+    seen = set()
+    for start in sorted(by_cell):
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = [start]
+        while queue:
+            cell = queue.pop(0)
+            order.append(cell)
+            for k in by_cell[cell]:
+                for other in sorted(constraints[k][0]):
+                    if other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+    return order
+
+
+def count_configurations(constraints, deadline, rng=None, limit=None):
+    """
+    Enumerates the mine placements on the cells of `constraints`, a list
+    of (cells, count) pairs, that satisfy every count.
+
+    Returns (cells, totals), where totals maps a number of mines k to
+    [number of placements with k mines, list of how many of those put a
+    mine on each cell]. With `rng`, branches are tried in random order
+    and the search stops after `limit` placements, for sampling.
+    Raises OutOfTime once `deadline` passes.
+    """
+    cells = component_order(constraints)
+    position = {cell: i for i, cell in enumerate(cells)}
+    needed = [count for _, count in constraints]
+    unassigned = [len(c) for c, _ in constraints]
+    cell_constraints = [[] for _ in cells]
+    for k, (constraint_cells, _) in enumerate(constraints):
+        for cell in constraint_cells:
+            cell_constraints[position[cell]].append(k)
+
+    assignment = [0] * len(cells)
+    totals = {}
+    found = [0]
+    nodes = [0]
+
+    def search(i, mines):
+        nodes[0] += 1
+        if nodes[0] % 1024 == 0 and time.perf_counter() > deadline:
+            raise OutOfTime
+        if i == len(cells):
+            entry = totals.setdefault(mines, [0, [0] * len(cells)])
+            entry[0] += 1
+            for j, value in enumerate(assignment):
+                if value:
+                    entry[1][j] += 1
+            found[0] += 1
+            return limit is not None and found[0] >= limit
+
+        values = (0, 1) if rng is None or rng.random() < 0.5 else (1, 0)
+        for value in values:
+            # The value must leave every constraint of this cell satisfiable
+            ok = True
+            for k in cell_constraints[i]:
+                left = needed[k] - value
+                if left < 0 or left > unassigned[k] - 1:
+                    ok = False
+                    break
+            if not ok:
+                continue
+            for k in cell_constraints[i]:
+                needed[k] -= value
+                unassigned[k] -= 1
+            assignment[i] = value
+            done = search(i + 1, mines + value)
+            for k in cell_constraints[i]:
+                needed[k] += value
+                unassigned[k] += 1
+            assignment[i] = 0
+            if done:
+                return True
+        return False
+
+    search(0, 0)
+    return cells, totals
+
+
+def sample_configurations(constraints, deadline, rng, samples=200):
+    """
+    Approximates count_configurations for components too large to
+    enumerate, from distinct placements found by randomized search
+    until `samples` are collected or `deadline` passes.
+    """
+    seen = set()
+    cells = component_order(constraints)
+    totals = {}
+    for _ in range(samples * 4):
+        if len(seen) >= samples or time.perf_counter() > deadline:
+            break
+        try:
+            order, found = count_configurations(constraints, deadline, rng, limit=1)
+        except OutOfTime:
+            break
+        for mines, (_, cell_mines) in found.items():
+            placement = tuple(sorted(cell for cell, value in zip(order, cell_mines) if value))
+            if placement in seen:
+                continue
+            seen.add(placement)
+            entry = totals.setdefault(mines, [0, [0] * len(cells)])
+            entry[0] += 1
+            for cell in placement:
+                entry[1][cells.index(cell)] += 1
+    return cells, totals
+
+
+def multiply(a, b):
+    """
+    Multiplies two polynomials given as coefficient lists.
+    """
+    product = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                product[i + j] += x * y
+    return product
+
 
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    # Components with more cells than this are sampled, not enumerated
+    MAX_EXACT_CELLS = 48
+
+    # Least time, in seconds, for sampling a component that could not be counted
+    MIN_SAMPLE_TIME = 0.01
+
+    # Assumed mine density when the total number of mines is not given
+    DEFAULT_DENSITY = 0.15
+
+    def __init__(self, height=8, width=8, mines=None, guess="probability", guess_time=0.5,
+                 bitset=False):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Store sentences as BitSentence bitmasks instead of sets of cells
+        self.bitset = bitset
+
+        # Total number of mines on the board, if known
+        self.total_mines = mines
+
+        # "probability" to guess the cell least likely to be a mine,
+        # "random" to guess uniformly, and the time budget per guess
+        self.guess = guess
+        self.guess_time = guess_time
+
+        # Exact configuration counts by component constraints, see mine_probabilities
+        self.component_cache = {}
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -158,26 +437,99 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, by id
+        self.sentences = {}
+        self.next_id = 0
+
+        # Maps each cell to the ids of the sentences that contain it
+        self.cell_index = {}
+
+        # Maps the key of each sentence's cells to its id, so the same
+        # sentence is never stored twice
+        self.by_cells = {}
+
+        # Ids of sentences that changed and must be looked at again
+        self.pending = []
+
+    @property
+    def knowledge(self):
+        """
+        List of sentences about the game known to be true.
+        """
+        return list(self.sentences.values())
+
+    def new_sentence(self, cells, count):
+        if self.bitset:
+            return BitSentence(cells, count, self.width)
+        return Sentence(cells, count)
+
+    def add_sentence(self, sentence):
+        """
+        Stores a new sentence unless one with the same cells is known,
+        and queues it for inference.
+        """
+        key = sentence.key()
+        if key in self.by_cells:
+            return
+        sentence_id = self.next_id
+        self.next_id += 1
+        self.sentences[sentence_id] = sentence
+        self.by_cells[key] = sentence_id
+        for cell in sentence.cells:
+            self.cell_index.setdefault(cell, set()).add(sentence_id)
+        self.pending.append(sentence_id)
+
+    def remove_sentence(self, sentence_id):
+        sentence = self.sentences.pop(sentence_id)
+        key = sentence.key()
+        if self.by_cells.get(key) == sentence_id:
+            del self.by_cells[key]
+        for cell in sentence.cells:
+            self.cell_index[cell].discard(sentence_id)
+
+    def update_sentences(self, cell, mine):
+        """
+        Marks cell as a mine (or safe) in every sentence containing it,
+        re-keying and queuing them.
+        """
+        for sentence_id in self.cell_index.pop(cell, ()):
+            sentence = self.sentences[sentence_id]
+            old_key = sentence.key()
+            if mine:
+                sentence.mark_mine(cell)
+            else:
+                sentence.mark_safe(cell)
+            if self.by_cells.get(old_key) == sentence_id:
+                del self.by_cells[old_key]
+            new_key = sentence.key()
+            if new_key in self.by_cells:
+                # Became a duplicate of a known sentence
+                self.sentences.pop(sentence_id)
+                for other in sentence.cells:
+                    self.cell_index[other].discard(sentence_id)
+                continue
+            self.by_cells[new_key] = sentence_id
+            self.pending.append(sentence_id)
 
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
+        if cell in self.mines:
+            return
         self.mines.add(cell)
-        for sentence in self.knowledge:
-                sentence.mark_mine(cell)
+        self.update_sentences(cell, True)
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell in self.safes:
+            return
         self.safes.add(cell)
-        for sentence in self.knowledge:
-                sentence.mark_safe(cell)
+        self.update_sentences(cell, False)
 
     def add_knowledge(self, cell, count):
         """
@@ -193,71 +545,57 @@ class MinesweeperAI():
                if it can be concluded based on the AI's knowledge base
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
+
+        Only sentences touched by the latest change are revisited: a
+        work queue holds the ids of sentences that were added or lost a
+        cell, and subset inference compares each one only with the
+        sentences it shares a cell with.
         """
         self.moves_made.add(cell)
         self.mark_safe(cell)
-        s_new = Sentence(set(), count)
+        cells = set()
         for i in range(cell[0]-1, cell[0]+2):
             for j in range(cell[1]-1, cell[1]+2):
                 if (i,j) in self.safes:
                     continue
                 elif (i,j) in self.mines:
-                    s_new.count -= 1
-                else:
-                    if 0 <= i < self.height and 0 <= j < self.width:
-                        s_new.cells.add((i,j))
-
-        self.knowledge.append(s_new)
-
-        for sentence in self.knowledge:
-            if sentence.known_mines():
-                for cell in sentence.known_mines().copy():
-                    self.mark_mine(cell)
-            if sentence.known_safes():
-                for cell in sentence.known_safes().copy():
-                    self.mark_safe(cell)
-            
-
-        Knowledge_changed = True
-
-        while Knowledge_changed:
-            Knowledge_changed = False
-            safes_copy = self.safes.copy()
-            mines_copy = self.mines.copy()
-
-            for sentence in self.knowledge:
-                if sentence.known_mines():
-                    for cell in sentence.known_mines().copy():
-                        self.mark_mine(cell)
-                if sentence.known_safes():
-                    # iterate over set may cause errors when set changes
-                    # to solve this issue, iterate voer the copy of the set 
-                    # while the original set can be altered
-                    for cell in sentence.known_safes().copy():
-                        self.mark_safe(cell)
-            
-            if self.safes != safes_copy:
-                Knowledge_changed = True
-            if self.mines != mines_copy:
-                Knowledge_changed = True
-
-            
-            # remove empty sentences
-            self.knowledge = [x for x in self.knowledge if x.cells]
-
-
-            for s1 in self.knowledge:
-                for s2 in self.knowledge:
-                    if s1.cells == s2.cells:
-                        continue
-                    # does not need to consider s1 is a superset of s2 because this comparaion can be made
-                    # when s1 = s2 and s2 = s1.
-                    elif s1.cells.issubset(s2.cells):
-                        s_new = Sentence(s2.cells - s1.cells, s2.count - s1.count)
-                        if s_new not in self.knowledge:
-                            Knowledge_changed = True
-                            self.knowledge.append(s_new)
-
+                    count -= 1
+                elif 0 <= i < self.height and 0 <= j < self.width:
+                    cells.add((i,j))
+        self.add_sentence(self.new_sentence(cells, count))
+
+        while self.pending:
+            sentence_id = self.pending.pop()
+            sentence = self.sentences.get(sentence_id)
+            if sentence is None:
+                continue
+
+            # Sentences with nothing left to say, or that settle all
+            # of their cells, are used up
+            if sentence.is_empty():
+                self.remove_sentence(sentence_id)
+                continue
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if mines or safes:
+                self.remove_sentence(sentence_id)
+                for other in mines.copy():
+                    self.mark_mine(other)
+                for other in safes.copy():
+                    self.mark_safe(other)
+                continue
+
+            # Subset inference against overlapping sentences only
+            overlapping = set()
+            for other in sentence.cells:
+                overlapping |= self.cell_index.get(other, set())
+            overlapping.discard(sentence_id)
+            for other_id in overlapping:
+                other = self.sentences[other_id]
+                if sentence.is_proper_subset(other):
+                    self.add_sentence(other.difference(sentence))
+                elif other.is_proper_subset(sentence):
+                    self.add_sentence(sentence.difference(other))
 
     def make_safe_move(self):
         """
@@ -275,13 +613,153 @@ class MinesweeperAI():
 
 
 
+    def mine_probabilities(self):
+        """
+        Returns a dict mapping every unopened cell not known to be a mine
+        to the probability that it is one, given the knowledge base.
+
+        Cells in sentences are split into independent components. For
+        each component the consistent mine placements are counted by
+        backtracking (and remembered, since most components do not
+        change between moves), or sampled if the component is too large
+        or the time budget runs out. Components are then combined, and
+        weighted by the number of ways to place the remaining mines on
+        the unconstrained cells.
+        """
+        deadline = time.perf_counter() + self.guess_time
+        candidates = [
+            (i, j) for i in range(self.height) for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines and (i, j) not in self.safes
+        ]
+
+        # Group sentences into components that share cells
+        parent = {}
+
+        def find(cell):
+            while parent[cell] != cell:
+                parent[cell] = parent[parent[cell]]
+                cell = parent[cell]
+            return cell
+
+        sentences = [sentence for sentence in self.sentences.values() if not sentence.is_empty()]
+        for sentence in sentences:
+            cells = list(sentence.cells)
+            for cell in cells:
+                parent.setdefault(cell, cell)
+            for cell in cells[1:]:
+                parent[find(cell)] = find(cells[0])
+        groups = {}
+        for sentence in sentences:
+            root = find(next(iter(sentence.cells)))
+            groups.setdefault(root, []).append((frozenset(sentence.cells), sentence.count))
+
+        components = []
+        for k, constraints in enumerate(groups.values()):
+            key = frozenset(constraints)
+            if key in self.component_cache:
+                components.append(self.component_cache[key])
+                continue
+            # Half of this component's share of the time for counting,
+            # the rest (and at least MIN_SAMPLE_TIME) for sampling if that fails
+            start = time.perf_counter()
+            share = max(deadline - start, 0) / (len(groups) - k)
+            size = len(set().union(*(cells for cells, _ in constraints)))
+            result = None
+            if size <= self.MAX_EXACT_CELLS:
+                try:
+                    result = count_configurations(constraints, start + share / 2)
+                    self.component_cache[key] = result
+                except OutOfTime:
+                    pass
+            if result is None:
+                sample_deadline = max(start + share, time.perf_counter() + self.MIN_SAMPLE_TIME)
+                result = sample_configurations(constraints, sample_deadline, random.Random(len(self.moves_made)))
+            components.append(result)
+
+        # A component with no placements found is treated as unconstrained
+        components = [(cells, totals) for cells, totals in components if totals]
+        frontier = set(cell for cells, _ in components for cell in cells)
+        unconstrained = [cell for cell in candidates if cell not in frontier]
+        polys = []
+        for _, totals in components:
+            poly = [0] * (max(totals, default=0) + 1)
+            for mines, (count, _) in totals.items():
+                poly[mines] = count
+            polys.append(poly)
+
+        # Weight of placing `mines` on the frontier in total
+        remaining = None if self.total_mines is None else self.total_mines - len(self.mines)
+        density = self.DEFAULT_DENSITY
+
+        def weight(mines):
+            if remaining is None:
+                return density ** mines * (1 - density) ** (len(frontier) - mines)
+            rest = remaining - mines
+            if rest < 0 or rest > len(unconstrained):
+                return 0
+            return math.comb(len(unconstrained), rest)
+
+        # Placement counts of all components but one, via prefix and suffix products
+        prefix = [[1]]
+        for poly in polys:
+            prefix.append(multiply(prefix[-1], poly))
+        suffix = [[1]]
+        for poly in reversed(polys):
+            suffix.append(multiply(suffix[-1], poly))
+        suffix.reverse()
+        combined = prefix[-1]
+        total = sum(count * weight(mines) for mines, count in enumerate(combined))
+        if not total:
+            # Sampled placements can all disagree with the number of mines
+            # left, in which case it is ignored
+            remaining = None
+            total = sum(count * weight(mines) for mines, count in enumerate(combined))
+
+        probabilities = {}
+        for c, (cells, totals) in enumerate(components):
+            others = multiply(prefix[c], suffix[c + 1])
+            others_weight = {
+                mines: sum(count * weight(mines + j) for j, count in enumerate(others))
+                for mines in totals
+            }
+            for i, cell in enumerate(cells):
+                probabilities[cell] = sum(
+                    cell_mines[i] * others_weight[mines] for mines, (_, cell_mines) in totals.items()
+                ) / total
+
+        if unconstrained:
+            if remaining is None:
+                p = density
+            else:
+                expected = sum(count * weight(mines) * (remaining - mines)
+                               for mines, count in enumerate(combined))
+                p = expected / total / len(unconstrained)
+            for cell in unconstrained:
+                probabilities[cell] = p
+        probabilities = {cell: probabilities[cell] for cell in candidates}
+
+        # Known safe cells not yet opened cannot be mines
+        for cell in self.safes - self.moves_made:
+            probabilities[cell] = 0
+        return probabilities
+
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        In "probability" guess mode, chooses randomly among the cells
+        least likely to be mines instead.
         """
+        if self.guess == "probability":
+            probabilities = self.mine_probabilities()
+            if not probabilities:
+                return None
+            lowest = min(probabilities.values())
+            return random.choice([cell for cell, p in probabilities.items() if p <= lowest + 1e-12])
+
         possible_moves = []
 
         for i in range(self.height):
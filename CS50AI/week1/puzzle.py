@@ -1,5 +1,14 @@
+import sys
+
+import logic
+import sat
+import truthtable
+
 from logic import *
 
+# Entailment backends, selectable from the command line
+ENGINES = ["sat", "truthtable", "enumerate"]
+
 AKnight = Symbol("A is a Knight")
 AKnave = Symbol("A is a Knave")
 
@@ -58,6 +67,10 @@ knowledge3 = And(
 
 
 def main():
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] not in ENGINES):
+        sys.exit(f"Usage: python puzzle.py [{'|'.join(ENGINES)}]")
+    engine = sys.argv[1] if len(sys.argv) == 2 else "sat"
+
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
     puzzles = [
         ("Puzzle 0", knowledge0),
@@ -70,9 +83,19 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
-                    print(f"    {symbol}")
+            for symbol in entailed_symbols(knowledge, symbols, engine):
+                print(f"    {symbol}")
+
+
+def entailed_symbols(knowledge, symbols, engine="sat"):
+    """
+    Returns the symbols entailed by knowledge, checked with the named engine.
+    """
+    if engine == "sat":
+        return sat.KnowledgeBase(knowledge).entailed(symbols)
+    if engine == "truthtable":
+        return truthtable.entailed(knowledge, symbols)
+    return [symbol for symbol in symbols if logic.model_check(knowledge, symbol)]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,428 @@
+"""
+SAT-based entailment for logic.py sentences
+
+model_check in logic.py enumerates all 2^n models. Here the sentences
+are Tseitin-encoded into clauses instead, and KB entails query is decided
+by asking a CDCL solver whether KB and not query can both hold.
+
+Literals are non-zero ints in the DIMACS style: variable v is true for
+literal v and false for literal -v.
+"""
+
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+
+class CNF():
+    """
+    Tseitin encoder: turns sentences into an equisatisfiable set of
+    clauses, introducing one variable per compound subsentence.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses = []
+
+        # Maps symbol names to their variables
+        self.symbols = {}
+
+        # Maps already encoded subsentences to their literals
+        self.encoded = {}
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def literal(self, sentence):
+        """
+        Returns a literal that is true exactly when `sentence` is,
+        adding the clauses that define it.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.new_var()
+            return self.symbols[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.encoded:
+            return self.encoded[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            v = self.new_var()
+            for part in parts:
+                self.clauses.append([-v, part])
+            self.clauses.append([v] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            v = self.new_var()
+            for part in parts:
+                self.clauses.append([v, -part])
+            self.clauses.append([-v] + parts)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            v = self.new_var()
+            self.clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            v = self.new_var()
+            self.clauses.extend([[-v, -a, b], [-v, a, -b], [v, a, b], [v, -a, -b]])
+        else:
+            raise TypeError(f"cannot encode {sentence!r}")
+
+        self.encoded[sentence] = v
+        return v
+
+    def add(self, sentence):
+        """
+        Adds clauses asserting that `sentence` is true. Top-level
+        conjunctions are split instead of getting a variable of their own.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct) for disjunct in sentence.disjuncts])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+class Solver():
+    """
+    CDCL SAT solver with two watched literals per clause, first-UIP
+    clause learning with non-chronological backjumping, activity-based
+    branching with phase saving, and solving under assumptions.
+
+    Learned clauses are kept between calls to `solve`, so asking many
+    related questions of one solver gets cheaper as it goes.
+    """
+
+    def __init__(self, num_vars=0, clauses=()):
+        self.num_vars = 0
+        self.clauses = []
+        self.watches = {}
+        self.value = [0]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.trail = []
+        self.trail_lim = []
+        self.queue_head = 0
+        self.bump = 1.0
+        self.ok = True
+        self.ensure_vars(num_vars)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def ensure_vars(self, num_vars):
+        """
+        Makes room for variables 1 to num_vars.
+        """
+        while self.num_vars < num_vars:
+            self.num_vars += 1
+            self.value.append(0)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches[self.num_vars] = []
+            self.watches[-self.num_vars] = []
+
+    def lit_value(self, lit):
+        """
+        Returns 1 if lit is true, -1 if false, 0 if unassigned.
+        """
+        return self.value[lit] if lit > 0 else -self.value[-lit]
+
+    def add_clause(self, lits):
+        """
+        Adds a clause. Returns False if the formula became unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.backtrack(0)
+        self.ensure_vars(max((abs(lit) for lit in lits), default=0))
+
+        # Drop duplicate and false literals, skip tautologies and satisfied clauses
+        clause = []
+        for lit in lits:
+            if -lit in clause or self.lit_value(lit) == 1:
+                return True
+            if lit not in clause and self.lit_value(lit) == 0:
+                clause.append(lit)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.attach(clause)
+        return self.ok
+
+    def attach(self, clause):
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def enqueue(self, lit, reason):
+        var = abs(lit)
+        self.value[var] = 1 if lit > 0 else -1
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Runs unit propagation. Returns a conflicting clause, or None.
+        """
+        while self.queue_head < len(self.trail):
+            false_lit = -self.trail[self.queue_head]
+            self.queue_head += 1
+            watching = self.watches[false_lit]
+            kept = []
+            for index, clause in enumerate(watching):
+                # Make sure the false literal is clause[1]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.lit_value(clause[0]) == 1:
+                    kept.append(clause)
+                    continue
+
+                # Look for a new literal to watch
+                for k in range(2, len(clause)):
+                    if self.lit_value(clause[k]) != -1:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.lit_value(clause[0]) == -1:
+                        kept.extend(watching[index + 1:])
+                        self.watches[false_lit] = kept
+                        return clause
+                    self.enqueue(clause[0], clause)
+            self.watches[false_lit] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives the first-UIP clause from a conflict. Returns the learned
+        clause, asserting literal first, and the level to backjump to.
+        """
+        current = len(self.trail_lim)
+        seen = set()
+        learned = [None]
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+        lit = None
+        while True:
+            for q in clause:
+                if q == lit:
+                    continue
+                var = abs(q)
+                if var not in seen and self.level[var] > 0:
+                    seen.add(var)
+                    self.bump_var(var)
+                    if self.level[var] == current:
+                        pending += 1
+                    else:
+                        learned.append(q)
+
+            # Walk back to the next literal of this level involved in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reason[abs(lit)]
+
+        learned[0] = -lit
+        self.bump *= 1.05
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal with the highest level second
+        second = max(range(1, len(learned)), key=lambda k: self.level[abs(learned[k])])
+        learned[1], learned[second] = learned[second], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def bump_var(self, var):
+        self.activity[var] += self.bump
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+
+    def backtrack(self, level):
+        """
+        Undoes all assignments above decision `level`.
+        """
+        if len(self.trail_lim) <= level:
+            return
+        for lit in self.trail[self.trail_lim[level]:]:
+            var = abs(lit)
+            self.phase[var] = lit > 0
+            self.value[var] = 0
+            self.reason[var] = None
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.queue_head = len(self.trail)
+
+    def pick_branch(self):
+        """
+        Returns the unassigned variable with the highest activity, or None.
+        """
+        best = None
+        best_activity = -1.0
+        for var in range(1, self.num_vars + 1):
+            if self.value[var] == 0 and self.activity[var] > best_activity:
+                best, best_activity = var, self.activity[var]
+        return best
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        `assumptions` true, False otherwise. On success `model()` holds a
+        satisfying assignment. The solver is left at decision level 0.
+        """
+        if not self.ok:
+            return False
+        self.ensure_vars(max((abs(lit) for lit in assumptions), default=0))
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.attach(learned)
+                    self.enqueue(learned[0], learned)
+                continue
+
+            # Assumptions are decided first, one per decision level
+            level = len(self.trail_lim)
+            if level < len(assumptions):
+                lit = assumptions[level]
+                if self.lit_value(lit) == -1:
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if self.lit_value(lit) == 0:
+                    self.enqueue(lit, None)
+                continue
+
+            var = self.pick_branch()
+            if var is None:
+                self.assignment = self.value[:]
+                self.backtrack(0)
+                return True
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(var if self.phase[var] else -var, None)
+
+    def model(self):
+        """
+        Returns the satisfying assignment found by the last successful
+        `solve`, as a list indexed by variable of True/False.
+        """
+        return [value > 0 for value in self.assignment]
+
+
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.clauses.append([-cnf.literal(query)])
+    return not Solver(cnf.num_vars, cnf.clauses).solve()
+
+
+# Answers from KnowledgeBase.ask
+ENTAILED = "entailed"
+CONTRADICTED = "contradicted"
+UNKNOWN = "unknown"
+
+
+class KnowledgeBase():
+    """
+    A knowledge sentence compiled once into a solver, for answering
+    many queries against it.
+
+    Each query is only encoded (its definitions are consistent with any
+    model of the knowledge) and tested by solving under an assumption,
+    so learned clauses carry over from one query to the next. A model of
+    the knowledge is kept to rule out one side of most queries without
+    solving at all.
+    """
+
+    def __init__(self, knowledge):
+        self.cnf = CNF()
+        self.cnf.add(knowledge)
+        self.solver = Solver(self.cnf.num_vars, self.cnf.clauses)
+        self.added = len(self.cnf.clauses)
+        self.consistent = self.solver.solve()
+        self.witness = self.solver.model() if self.consistent else None
+
+    def literal(self, query):
+        """
+        Returns the literal for `query`, passing any new definitional
+        clauses on to the solver.
+        """
+        lit = self.cnf.literal(query)
+        for clause in self.cnf.clauses[self.added:]:
+            self.solver.add_clause(clause)
+        self.added = len(self.cnf.clauses)
+        return lit
+
+    def holds_in_witness(self, lit):
+        if abs(lit) >= len(self.witness):
+            return None
+        return self.witness[abs(lit)] == (lit > 0)
+
+    def ask(self, query):
+        """
+        Returns ENTAILED if the knowledge entails query, CONTRADICTED if
+        it entails not query, UNKNOWN otherwise. Inconsistent knowledge
+        entails everything.
+        """
+        if not self.consistent:
+            return ENTAILED
+        lit = self.literal(query)
+
+        # Definitions added after the witness was found may leave it silent
+        in_witness = self.holds_in_witness(lit)
+        if in_witness is None:
+            if not self.solver.solve([lit]):
+                return CONTRADICTED
+            in_witness = True
+
+        # Query and its negation are each possible in some model unless
+        # the solver proves otherwise
+        if in_witness:
+            return UNKNOWN if self.solver.solve([-lit]) else ENTAILED
+        return UNKNOWN if self.solver.solve([lit]) else CONTRADICTED
+
+    def ask_all(self, queries):
+        """
+        Returns a dict mapping each query to the answer of `ask`.
+        """
+        return {query: self.ask(query) for query in queries}
+
+    def entailed(self, queries):
+        """
+        Returns the queries that the knowledge entails, in order.
+        """
+        return [query for query in queries if self.ask(query) == ENTAILED]
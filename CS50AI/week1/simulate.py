@@ -0,0 +1,155 @@
+"""
+Headless Minesweeper self-play
+
+Plays many seeded games of MinesweeperAI against Minesweeper across a
+process pool and reports win rate, guesses per game, add_knowledge
+latency and knowledge base size over the course of a game.
+
+Usage: python simulate.py [--games N] [--height H] [--width W] [--mines M]
+                          [--guess probability|random] [--bitset]
+                          [--workers P] [--seed S] [--csv FILE] [--json FILE]
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import random
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def play_game(seed, height, width, mines, guess="probability", bitset=False, guess_time=0.5):
+    """
+    Plays one game with every random choice seeded by `seed`.
+    Returns a dict of per-game statistics.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, guess=guess,
+                       guess_time=guess_time, bitset=bitset)
+
+    guesses = 0
+    knowledge_times = []
+    knowledge_sizes = []
+    won = False
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            guesses += 1
+        if move is None or game.is_mine(move):
+            break
+
+        start = time.perf_counter()
+        ai.add_knowledge(move, game.nearby_mines(move))
+        knowledge_times.append(time.perf_counter() - start)
+        knowledge_sizes.append(len(ai.sentences))
+
+        if len(ai.moves_made) == height * width - mines:
+            won = True
+            break
+
+    return {
+        "seed": seed,
+        "won": won,
+        "moves": len(ai.moves_made),
+        "guesses": guesses,
+        "add_knowledge_times": knowledge_times,
+        "knowledge_sizes": knowledge_sizes,
+    }
+
+
+def _play(args):
+    return play_game(*args)
+
+
+def percentile(sorted_values, fraction):
+    """
+    Returns the value at `fraction` of the way through sorted_values.
+    """
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def summarize(games):
+    """
+    Returns summary statistics over a list of play_game results.
+    """
+    times = sorted(t for game in games for t in game["add_knowledge_times"])
+
+    # Mean knowledge base size after each move, over the games that got that far
+    sizes = []
+    longest = max((len(game["knowledge_sizes"]) for game in games), default=0)
+    for move in range(longest):
+        at_move = [game["knowledge_sizes"][move] for game in games if len(game["knowledge_sizes"]) > move]
+        sizes.append(sum(at_move) / len(at_move))
+
+    return {
+        "games": len(games),
+        "win_rate": sum(game["won"] for game in games) / len(games) if games else 0,
+        "guesses_per_game": sum(game["guesses"] for game in games) / len(games) if games else 0,
+        "add_knowledge_mean_ms": 1000 * sum(times) / len(times) if times else 0,
+        "add_knowledge_p99_ms": 1000 * percentile(times, 0.99),
+        "knowledge_size_by_move": sizes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Minesweeper AI games headless.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--guess", choices=["probability", "random"], default="probability")
+    parser.add_argument("--guess-time", type=float, default=0.5)
+    parser.add_argument("--bitset", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="write one row per game to this file")
+    parser.add_argument("--json", help="write the summary to this file")
+    args = parser.parse_args()
+    if not 0 < args.mines < args.height * args.width:
+        parser.error("mines must be between 1 and height * width - 1")
+
+    # Each game gets its own seed derived from --seed, so results do not
+    # depend on how games are spread over workers
+    seeds = random.Random(args.seed).sample(range(2 ** 31), args.games)
+    tasks = [(seed, args.height, args.width, args.mines, args.guess, args.bitset, args.guess_time)
+             for seed in seeds]
+    with multiprocessing.Pool(args.workers) as pool:
+        games = pool.map(_play, tasks, chunksize=max(1, len(tasks) // 64))
+
+    summary = summarize(games)
+    print(f"{summary['games']} games of {args.height}x{args.width} with {args.mines} mines")
+    print(f"  win rate:        {summary['win_rate']:.3f}")
+    print(f"  guesses/game:    {summary['guesses_per_game']:.2f}")
+    print(f"  add_knowledge:   mean {summary['add_knowledge_mean_ms']:.3f} ms, "
+          f"p99 {summary['add_knowledge_p99_ms']:.3f} ms")
+    sizes = summary["knowledge_size_by_move"]
+    if sizes:
+        print(f"  knowledge size:  peak mean {max(sizes):.1f} sentences at move {sizes.index(max(sizes)) + 1}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["seed", "won", "moves", "guesses", "add_knowledge_mean_ms",
+                             "add_knowledge_max_ms", "max_knowledge_size"])
+            for game in games:
+                times = game["add_knowledge_times"]
+                writer.writerow([
+                    game["seed"], int(game["won"]), game["moves"], game["guesses"],
+                    f"{1000 * sum(times) / len(times):.4f}" if times else "",
+                    f"{1000 * max(times):.4f}" if times else "",
+                    max(game["knowledge_sizes"], default=0),
+                ])
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
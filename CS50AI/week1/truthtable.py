@@ -0,0 +1,139 @@
+"""
+Bit-parallel truth tables for logic.py sentences
+
+Instead of evaluating a sentence once per model, a sentence is compiled
+into a straight-line program over bit vectors: bit m of a vector is the
+sentence's value in model m, each symbol is a column of the truth table
+and each connective is one bitwise operation on whole columns. Python
+ints serve as the bit vectors, so the operations run in C over the
+entire table at once.
+
+The 2^n models are processed CHUNK_BITS symbols at a time, so memory
+stays bounded for 20-24 symbols.
+"""
+
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+# Models per chunk are 2^CHUNK_BITS, i.e. 8 KiB per vector
+CHUNK_BITS = 16
+
+
+class Program():
+    """
+    A compiled list of sentences sharing one instruction list.
+
+    Each instruction is (op, operands) where operands are indices of
+    earlier instructions, or a symbol index for "symbol".
+    """
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+        self.instructions = []
+        self.compiled = {}
+
+    def emit(self, op, operands):
+        self.instructions.append((op, operands))
+        return len(self.instructions) - 1
+
+    def compile(self, sentence):
+        """
+        Adds the instructions for `sentence` and returns the index of
+        the one holding its value. Repeated subsentences are shared.
+        """
+        if sentence in self.compiled:
+            return self.compiled[sentence]
+        if isinstance(sentence, Symbol):
+            slot = self.emit("symbol", self.index[sentence.name])
+        elif isinstance(sentence, Not):
+            slot = self.emit("not", (self.compile(sentence.operand),))
+        elif isinstance(sentence, And):
+            slot = self.emit("and", tuple(self.compile(c) for c in sentence.conjuncts))
+        elif isinstance(sentence, Or):
+            slot = self.emit("or", tuple(self.compile(d) for d in sentence.disjuncts))
+        elif isinstance(sentence, Implication):
+            slot = self.emit("implies", (self.compile(sentence.antecedent),
+                                         self.compile(sentence.consequent)))
+        elif isinstance(sentence, Biconditional):
+            slot = self.emit("iff", (self.compile(sentence.left), self.compile(sentence.right)))
+        else:
+            raise TypeError(f"cannot compile {sentence!r}")
+        self.compiled[sentence] = slot
+        return slot
+
+    def chunks(self):
+        """
+        Yields (width, values) for each chunk of the truth table, where
+        values[i] is the bit vector of instruction i over `width` models.
+        """
+        n = len(self.symbols)
+        low = min(n, CHUNK_BITS)
+        width = 1 << low
+        full = (1 << width) - 1
+
+        # Column of symbol i < low: blocks of 2^i zeros then 2^i ones
+        columns = []
+        for i in range(low):
+            block = ((1 << (1 << i)) - 1) << (1 << i)
+            pattern = block
+            period = 2 << i
+            while period < width:
+                pattern |= pattern << period
+                period *= 2
+            columns.append(pattern)
+
+        for chunk in range(1 << (n - low)):
+            values = []
+            for op, operands in self.instructions:
+                if op == "symbol":
+                    if operands < low:
+                        value = columns[operands]
+                    else:
+                        value = full if chunk >> (operands - low) & 1 else 0
+                elif op == "not":
+                    value = values[operands[0]] ^ full
+                elif op == "and":
+                    value = full
+                    for operand in operands:
+                        value &= values[operand]
+                elif op == "or":
+                    value = 0
+                    for operand in operands:
+                        value |= values[operand]
+                elif op == "implies":
+                    value = (values[operands[0]] ^ full) | values[operands[1]]
+                else:
+                    value = (values[operands[0]] ^ values[operands[1]]) ^ full
+                values.append(value)
+            yield width, values
+
+
+def entailed(knowledge, queries):
+    """
+    Returns the queries entailed by knowledge, in order, checking all of
+    them against one pass over the truth table.
+    """
+    names = set(knowledge.symbols())
+    for query in queries:
+        names |= query.symbols()
+    program = Program(sorted(names))
+    kb = program.compile(knowledge)
+    slots = [program.compile(query) for query in queries]
+
+    remaining = list(range(len(queries)))
+    for _, values in program.chunks():
+        models = values[kb]
+        if not models:
+            continue
+        # A query fails as soon as some model of the knowledge falsifies it
+        remaining = [q for q in remaining if models & ~values[slots[q]] == 0]
+        if not remaining:
+            break
+    return [queries[q] for q in remaining]
+
+
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query.
+    """
+    return bool(entailed(knowledge, [query]))
@@ -1,4 +1,5 @@
 import csv
+import heapq
 import itertools
 import sys
 
@@ -36,14 +37,41 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Possible numbers of copies of the gene
+GENES = (0, 1, 2)
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) < 2 or sys.argv[2:] not in [[], ["--enumerate"]]:
+        sys.exit("Usage: python heredity.py data.csv [--enumerate]")
     people = load_data(sys.argv[1])
 
+    # Exact inference on a junction tree, or summing every joint probability
+    if len(sys.argv) == 3:
+        probabilities = enumerate_probabilities(people)
+    else:
+        probabilities = JunctionTree(people).probabilities()
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Returns each person's gene and trait distributions by summing the
+    joint probability of every assignment of genes and traits that is
+    consistent with the evidence. Takes time exponential in the number
+    of people.
+    """
+
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -83,15 +111,7 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -191,7 +211,7 @@ def joint_probability(people, one_gene, two_genes, have_trait):
                 if people[person]["mother"] in no_gene and people[person]["father"] in no_gene:
                     p_current[person] = PROBS["mutation"] * (1 - PROBS["mutation"]) * 2
                 elif people[person]["mother"] in no_gene and people[person]["father"] in one_gene:
-                    p_current[person] = PROBS["mutation"] * 0.5 * (1 - PROBS["mutation"]) + (
+                    p_current[person] = PROBS["mutation"] * 0.5 + (
                         (1 - PROBS["mutation"]) * 0.5)
                 elif people[person]["mother"] in no_gene and people[person]["father"] in two_genes:
                     p_current[person] = PROBS["mutation"] * PROBS["mutation"] + (
@@ -210,7 +230,7 @@ def joint_probability(people, one_gene, two_genes, have_trait):
                 elif people[person]["mother"] in two_genes and people[person]["father"] in one_gene:
                     p_current[person] = (1 - PROBS["mutation"]) * 0.5 + PROBS["mutation"] * 0.5
                 else:
-                    p_current[person] = PROBS["mutation"] * PROBS["mutation"]
+                    p_current[person] = PROBS["mutation"] * (1 - PROBS["mutation"]) * 2
                 
                 p_current[person] *= (
                         PROBS["trait"][1][True] * int(person in have_trait) + 
@@ -280,5 +300,236 @@ def normalize(probabilities):
 
 
 
+def inheritance(mother_genes, father_genes):
+    """
+    Returns the distribution of a child's number of copies of the gene,
+    given how many copies the mother and father have.
+    """
+    passes = []
+    for genes in (mother_genes, father_genes):
+        if genes == 0:
+            passes.append(PROBS["mutation"])
+        elif genes == 1:
+            # Passing the one copy without mutation, or the other with it
+            passes.append(0.5)
+        else:
+            passes.append(1 - PROBS["mutation"])
+    from_mother, from_father = passes
+    return {
+        2: from_mother * from_father,
+        1: from_mother * (1 - from_father) + (1 - from_mother) * from_father,
+        0: (1 - from_mother) * (1 - from_father)
+    }
+
+
+class Factor():
+    """
+    A nonnegative function of some people's numbers of gene copies,
+    stored as a table from each assignment of copies to `variables`
+    (a tuple of names, in the same order) to its value.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    def multiply(self, other):
+        """
+        Returns the product of this factor and `other`, over the
+        variables of both.
+        """
+        variables = self.variables + tuple(v for v in other.variables if v not in self.variables)
+        mine = [variables.index(v) for v in self.variables]
+        theirs = [variables.index(v) for v in other.variables]
+        table = dict()
+        for assignment in itertools.product(GENES, repeat=len(variables)):
+            table[assignment] = (self.table[tuple(assignment[i] for i in mine)] *
+                                 other.table[tuple(assignment[i] for i in theirs)])
+        return Factor(variables, table)
+
+    def sum_out(self, keep):
+        """
+        Returns this factor summed over every variable not in `keep`,
+        scaled to sum to 1.
+        """
+        variables = tuple(v for v in self.variables if v in keep)
+        positions = [self.variables.index(v) for v in variables]
+        table = dict.fromkeys(itertools.product(GENES, repeat=len(variables)), 0)
+        for assignment, value in self.table.items():
+            table[tuple(assignment[i] for i in positions)] += value
+
+        # Only ratios matter, and scaling keeps long products from underflowing
+        total = sum(table.values())
+        for assignment in table:
+            table[assignment] /= total
+        return Factor(variables, table)
+
+
+class JunctionTree():
+    """
+    Exact inference over a family's genes.
+
+    The Bayesian network has a gene variable per person, with a factor
+    for the unconditional gene distribution of people without parents
+    in the data, one for inheriting from the parents of everyone else,
+    and one for the known trait of each person whose trait is given.
+    Traits that are not given do not need variables of their own: each
+    depends only on its person's genes, so its distribution follows
+    from theirs.
+
+    Variables are eliminated one at a time, each time picking the one
+    whose elimination adds fewest edges to the moralized graph. Each
+    elimination gives a clique (the variable and its neighbours at that
+    point), and its parent clique is that of the first of those
+    neighbours to be eliminated later. Passing messages up this tree and back down gives
+    every clique's distribution, and so every person's, in time linear
+    in the number of people and exponential only in the clique size,
+    including for pedigrees with loops.
+    """
+
+    def __init__(self, people):
+        self.people = people
+
+        # Moral graph: each child is connected to its parents, and the
+        # parents to each other
+        neighbors = {person: set() for person in people}
+        for person in people:
+            mother, father = people[person]["mother"], people[person]["father"]
+            if mother is not None:
+                for a, b in ((person, mother), (person, father), (mother, father)):
+                    neighbors[a].add(b)
+                    neighbors[b].add(a)
+
+        # Eliminate the person whose neighbours need fewest new edges to
+        # connect them all to each other (min-fill), adding those edges
+        def fill_in(person):
+            return sum(1 for a, b in itertools.combinations(neighbors[person], 2) if b not in neighbors[a])
+
+        self.cliques = []
+        self.position = dict()
+        score = {person: (fill_in(person), len(neighbors[person])) for person in people}
+        queue = [(score[person], person) for person in people]
+        heapq.heapify(queue)
+        while queue:
+            entry, person = heapq.heappop(queue)
+            if person in self.position or entry != score[person]:
+                continue
+            self.position[person] = len(self.cliques)
+            self.cliques.append((person,) + tuple(sorted(neighbors[person])))
+            for neighbor in neighbors[person]:
+                neighbors[neighbor].discard(person)
+                neighbors[neighbor] |= neighbors[person] - {neighbor}
+
+            # Only the scores of people near the eliminated one change
+            affected = set(neighbors[person])
+            for neighbor in neighbors[person]:
+                affected |= neighbors[neighbor]
+            for other in affected:
+                score[other] = (fill_in(other), len(neighbors[other]))
+                heapq.heappush(queue, (score[other], other))
+
+        # Every clique's parent comes later in elimination order
+        self.parent = [
+            min(self.position[v] for v in clique[1:]) if len(clique) > 1 else None
+            for clique in self.cliques
+        ]
+        self.children = [[] for _ in self.cliques]
+        for i, parent in enumerate(self.parent):
+            if parent is not None:
+                self.children[parent].append(i)
+
+        # Each factor goes to the clique of its first variable eliminated,
+        # which holds all of its variables
+        self.potentials = [
+            Factor(clique, dict.fromkeys(itertools.product(GENES, repeat=len(clique)), 1))
+            for clique in self.cliques
+        ]
+        for factor in self.factors():
+            i = min(self.position[v] for v in factor.variables)
+            self.potentials[i] = self.potentials[i].multiply(factor)
+
+    def factors(self):
+        """
+        Returns the network's factors.
+        """
+        factors = []
+        for person in self.people:
+            mother, father = self.people[person]["mother"], self.people[person]["father"]
+            if mother is None:
+                factors.append(Factor((person,), {(g,): PROBS["gene"][g] for g in GENES}))
+            else:
+                table = dict()
+                for mother_genes, father_genes in itertools.product(GENES, repeat=2):
+                    child = inheritance(mother_genes, father_genes)
+                    for g in GENES:
+                        table[(mother_genes, father_genes, g)] = child[g]
+                factors.append(Factor((mother, father, person), table))
+
+            trait = self.people[person]["trait"]
+            if trait is not None:
+                factors.append(Factor((person,), {(g,): PROBS["trait"][g][trait] for g in GENES}))
+        return factors
+
+    def gene_distributions(self):
+        """
+        Returns each person's distribution of gene copies, given the
+        known traits.
+        """
+        n = len(self.cliques)
+
+        # Upward pass, in elimination order: everything below a clique,
+        # summed down to what it shares with its parent
+        up = [None] * n
+        for i in range(n):
+            belief = self.potentials[i]
+            for child in self.children[i]:
+                belief = belief.multiply(up[child])
+            if self.parent[i] is not None:
+                up[i] = belief.sum_out(self.cliques[i][1:])
+
+        # Downward pass, in reverse: everything outside a clique's subtree
+        down = [None] * n
+        distributions = dict()
+        for i in reversed(range(n)):
+            belief = self.potentials[i]
+            if down[i] is not None:
+                belief = belief.multiply(down[i])
+            for child in self.children[i]:
+                message = belief
+                for other in self.children[i]:
+                    if other != child:
+                        message = message.multiply(up[other])
+                down[child] = message.sum_out(self.cliques[child][1:])
+            for child in self.children[i]:
+                belief = belief.multiply(up[child])
+
+            person = self.cliques[i][0]
+            table = belief.sum_out((person,)).table
+            distributions[person] = {g: table[(g,)] for g in (2, 1, 0)}
+        return distributions
+
+    def probabilities(self):
+        """
+        Returns each person's gene and trait distributions, in the same
+        form as enumerate_probabilities.
+        """
+        probabilities = dict()
+        genes = self.gene_distributions()
+        for person in self.people:
+            trait = self.people[person]["trait"]
+            if trait is None:
+                has_trait = sum(genes[person][g] * PROBS["trait"][g][True] for g in GENES)
+            else:
+                has_trait = 1 if trait else 0
+            probabilities[person] = {
+                "gene": genes[person],
+                "trait": {
+                    True: has_trait,
+                    False: 1 - has_trait
+                }
+            }
+        return probabilities
+
+
 if __name__ == "__main__":
     main()
@@ -1,54 +1,339 @@
+import heapq
+import json
+import math
+import multiprocessing
 import os
 import random
 import re
 import sys
+from array import array
+from collections import deque
 
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Power iteration stops once the L1 change between iterations is below this
+TOLERANCE = 1e-6
+MAX_ITERATIONS = 1000
+
+# Incremental updates fall back to power iteration after this many
+# pushes per page, see update_pagerank
+PUSHES_PER_PAGE = 2
+
+# Default error of each value returned by personalized_pagerank, and the
+# probability that the random walks it makes leave a value off by more
+PERSONALIZED_TOLERANCE = 1e-3
+FAILURE_PROBABILITY = 0.01
+
+# Links found in each page of a corpus, see crawl
+CACHE_FILE = "pagerank.cache"
+CACHE_MAGIC = b"PRCACHE\0"
+CACHE_VERSION = 1
+
+# Characters of a page read at a time while looking for links
+CHUNK_SIZE = 1 << 16
+
+# Longest anchor tag, up to its href, that is carried over between chunks
+MAX_TAG_LENGTH = 4096
+
+# Fewer changed pages than this are parsed without starting a process pool
+PARALLEL_THRESHOLD = 1024
+
+# Names are stored NUL-separated in the cache, so links with a NUL, which
+# cannot name a file, are not matched
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"\0]*)\"")
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python pagerank.py corpus [page ...]")
     corpus = crawl(sys.argv[1])
+    if len(sys.argv) > 2:
+        missing = [page for page in sys.argv[2:] if page not in corpus]
+        if missing:
+            sys.exit(f"Not in corpus: {', '.join(missing)}")
+        top, error = personalized_pagerank(corpus, sys.argv[2:], DAMPING)
+        print(f"Personalized PageRank Results for {', '.join(sys.argv[2:])} (error {error:.1e})")
+        for page, rank in top:
+            print(f"  {page}: {rank:.4f}")
+        return
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
         
-    ranks = iterate_pagerank(corpus, DAMPING)
+    graph = LinkGraph(corpus)
+    rank, iterations, residual = power_iteration(graph, DAMPING)
+    ranks = dict(zip(graph.pages, rank))
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
+    print(f"  ({iterations} iterations, L1 residual {residual:.2e})")
 
 
 
-def crawl(directory):
+def crawl(directory, use_cache=True, workers=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    The links found in each page are kept in CACHE_FILE in `directory`,
+    keyed on the page's mtime and size, so a re-run only parses pages
+    that are new or changed and merges them into the cached ones. When
+    there are many of those they are parsed in a pool of `workers`
+    processes.
     """
-    pages = dict()
+    names, cached = read_cache(directory) if use_cache else ([], {})
+
+    # Page names interned to ints, in the order they were first seen
+    index = {name: i for i, name in enumerate(names)}
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
+    # Reuse the cached links of every page that has not changed
+    pages = {}
+    changed = {}
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".html") or not entry.is_file():
             continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+        stat = entry.stat()
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if entry.name in cached and cached[entry.name][0] == signature:
+            pages[entry.name] = cached[entry.name]
+        else:
+            changed[entry.path] = signature
+
+    pool = None
+    if len(changed) >= PARALLEL_THRESHOLD and workers != 1:
+        pool = multiprocessing.Pool(workers)
+        parsed = pool.imap_unordered(parse_page, changed, chunksize=64)
+    else:
+        parsed = map(parse_page, changed)
+    for path, links in parsed:
+        ids = array("i", [index.setdefault(link, len(index)) for link in links])
+        pages[os.path.basename(path)] = (changed[path], ids)
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    names = list(index)
+    if use_cache and (changed or len(pages) != len(cached)):
+        write_cache(directory, names, pages)
 
     # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
+    linkable = [name if name in pages else None for name in names]
+    corpus = dict()
+    for filename, (_, links) in pages.items():
+        corpus[filename] = set(map(linkable.__getitem__, links))
+        corpus[filename].discard(None)
+    return corpus
+
+
+def parse_page(path):
+    """
+    Returns (path, links) with the set of other pages linked to by the
+    HTML file at `path`.
+
+    The file is scanned CHUNK_SIZE characters at a time, carrying over
+    any anchor tag cut off at the end of a chunk, so pages of any size
+    are parsed in bounded memory.
+    """
+    filename = os.path.basename(path)
+    links = set()
+    carry = ""
+    with open(path) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            text = carry + chunk
+            links.update(LINK_PATTERN.findall(text))
+            if len(chunk) < CHUNK_SIZE:
+                break
+            # Carry the last anchor tag over in case it is cut off, or the
+            # last character in case it starts one. Links found twice are
+            # only added once.
+            tag = text.rfind("<a", max(0, len(text) - MAX_TAG_LENGTH))
+            carry = text[tag:] if tag >= 0 else text[-1:]
+    links.discard(filename)
+    return path, links
 
-    return pages
+
+def read_cache(directory):
+    """
+    Reads CACHE_FILE in `directory`.
+
+    Returns (names, pages) where names is the list of interned page
+    names and pages maps each cached page to ((mtime_ns, size), links)
+    with links an array of indices into names. Returns an empty cache if
+    there is none or it is from another version or unreadable.
+    """
+    try:
+        with open(os.path.join(directory, CACHE_FILE), "rb") as f:
+            data = f.read()
+        start = len(CACHE_MAGIC) + 8
+        if data[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+            return [], {}
+        version = int.from_bytes(data[len(CACHE_MAGIC):len(CACHE_MAGIC) + 4], "little")
+        header_size = int.from_bytes(data[len(CACHE_MAGIC) + 4:start], "little")
+        if version != CACHE_VERSION:
+            return [], {}
+        header = json.loads(data[start:start + header_size])
+        if header["byteorder"] != sys.byteorder:
+            return [], {}
+
+        offset = start + header_size
+        sections = {}
+        for name, kind, size in (("names", None, header["names"]), ("files", "q", 3 * header["files"]),
+                                 ("offsets", "q", header["files"] + 1), ("links", "i", header["links"])):
+            if kind is None:
+                sections[name] = data[offset:offset + size]
+                offset += size
+            else:
+                sections[name] = array(kind)
+                sections[name].frombytes(data[offset:offset + size * sections[name].itemsize])
+                offset += size * sections[name].itemsize
+        if offset != len(data):
+            return [], {}
+    except (OSError, ValueError, KeyError):
+        return [], {}
+
+    names = sections["names"].decode().split("\0") if sections["names"] else []
+    files, offsets, links = sections["files"], sections["offsets"], sections["links"]
+    pages = {}
+    for i in range(header["files"]):
+        name, mtime, size = files[3 * i:3 * i + 3]
+        pages[names[name]] = ((mtime, size), links[offsets[i]:offsets[i + 1]])
+    return names, pages
+
+
+def write_cache(directory, names, pages):
+    """
+    Writes pages, as returned by read_cache, to CACHE_FILE in `directory`.
+
+    Layout: magic, version and header length, a JSON header with the
+    section sizes, then the NUL-separated UTF-8 names, (name, mtime_ns,
+    size) for each page, the offsets of each page's links and the links
+    themselves as native int arrays. Only names still in use are kept.
+    Returns False if the cache could not be written.
+    """
+    # Renumber the names that are still referenced
+    used = {}
+    files = array("q")
+    offsets = array("q", [0])
+    links = array("i")
+    for filename, ((mtime, size), ids) in pages.items():
+        files.extend((used.setdefault(filename, len(used)), mtime, size))
+        for link in ids:
+            links.append(used.setdefault(names[link], len(used)))
+        offsets.append(len(links))
+    blob = "\0".join(used).encode()
+
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "names": len(blob),
+        "files": len(pages),
+        "links": len(links),
+    }).encode()
+
+    path = os.path.join(directory, CACHE_FILE)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(CACHE_MAGIC)
+            f.write(CACHE_VERSION.to_bytes(4, "little"))
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            f.write(blob)
+            files.tofile(f)
+            offsets.tofile(f)
+            links.tofile(f)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+class LinkGraph():
+    """
+    Link structure of a corpus in compressed sparse row form.
+
+    Pages are numbered in sorted order. The pages linked to by page i are
+    `out_targets[out_offsets[i]:out_offsets[i + 1]]`, and the pages
+    linking to page i are `in_sources[in_offsets[i]:in_offsets[i + 1]]`.
+    Pages without links ("dangling") are listed in `dangling`; they are
+    treated as linking to every page without storing those links.
+    """
+
+    def __init__(self, corpus):
+        self.pages = sorted(corpus)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        n = len(self.pages)
+
+        self.out_offsets = array("l", [0])
+        self.out_targets = array("l")
+        in_counts = [0] * (n + 1)
+        for page in self.pages:
+            targets = sorted(self.index[link] for link in corpus[page] if link in self.index)
+            self.out_targets.extend(targets)
+            self.out_offsets.append(len(self.out_targets))
+            for target in targets:
+                in_counts[target + 1] += 1
+
+        self.out_degree = array("l", (self.out_offsets[i + 1] - self.out_offsets[i] for i in range(n)))
+        self.dangling = [i for i in range(n) if self.out_degree[i] == 0]
+
+        # Transpose the out-links into in-links
+        for i in range(n):
+            in_counts[i + 1] += in_counts[i]
+        self.in_offsets = array("l", in_counts)
+        self.in_sources = array("l", [0]) * len(self.out_targets)
+        fill = in_counts[:-1]
+        for source in range(n):
+            for k in range(self.out_offsets[source], self.out_offsets[source + 1]):
+                target = self.out_targets[k]
+                self.in_sources[fill[target]] = source
+                fill[target] += 1
+
+    def __len__(self):
+        return len(self.pages)
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                    start=None):
+    """
+    Computes PageRank over a LinkGraph by power iteration.
+
+    Each iteration is one sparse matrix-vector product over the in-links,
+    O(pages + links). Dangling pages spread their rank evenly over all
+    pages, which is a rank-one correction added to every page rather
+    than stored links. Iteration starts from `start` (uniform if None)
+    and stops when the L1 change is below `tolerance`.
+
+    Returns (ranks, iterations, residual) with ranks a list in page order.
+    """
+    n = len(graph)
+    rank = list(start) if start is not None else [1 / n] * n
+    in_offsets = graph.in_offsets
+    in_sources = graph.in_sources
+    out_degree = graph.out_degree
+
+    residual = float("inf")
+    iterations = 0
+    while residual >= tolerance and iterations < max_iterations:
+        share = [rank[i] / out_degree[i] if out_degree[i] else 0 for i in range(n)]
+        dangling_rank = sum(rank[i] for i in graph.dangling)
+        base = (1 - damping_factor) / n + damping_factor * dangling_rank / n
+        new_rank = [
+            base + damping_factor * sum(share[source] for source in in_sources[in_offsets[i]:in_offsets[i + 1]])
+            for i in range(n)
+        ]
+        residual = sum(abs(new - old) for new, old in zip(new_rank, rank))
+        rank = new_rank
+        iterations += 1
+    return rank, iterations, residual
 
 
 def transition_model(corpus, page, damping_factor):
@@ -83,47 +368,72 @@ def transition_model(corpus, page, damping_factor):
     return visit_prob
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def random_walk(graph, damping_factor, steps, seed=None):
+    """
+    Walks `steps` pages of the random surfer over a LinkGraph and returns
+    an array of visit counts in page order.
+
+    Each step is O(1): with probability `damping_factor` follow a link
+    chosen uniformly from the current page's slice of `out_targets`,
+    otherwise (or always, from a page without links) jump to a page
+    chosen uniformly from the whole corpus.
+    """
+    rng = random.Random(seed)
+    uniform = rng.random
+    n = len(graph)
+    out_offsets = graph.out_offsets
+    out_targets = graph.out_targets
+    out_degree = graph.out_degree
+
+    counts = array("l", [0]) * n
+    page = int(uniform() * n)
+    for _ in range(steps):
+        counts[page] += 1
+        degree = out_degree[page]
+        if degree and uniform() < damping_factor:
+            page = out_targets[out_offsets[page] + int(uniform() * degree)]
+        else:
+            page = int(uniform() * n)
+    return counts
+
+
+def _walk(args):
+    return random_walk(*args)
+
+
+def sample_pagerank(corpus, damping_factor, n, walkers=1, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    The samples are split over `walkers` independent random walks, each
+    with its own RNG stream seeded from `seed`, which run in a process
+    pool when there is more than one.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    # n, number of samples that should be generated
-    # return a dictionary, key is each page, value is PageRank, proportion of all the samples that corresponded to that page
-    # The sum of the values should be equal to 1.
-    # first sample is generated by randomly choosing a page. 
-    # The next sample should be generated based on the previous sample's transition model. 
-
-    states = []
-    allpages = list(corpus)
-    
-    i = 0
-    while i < n:
-        if i == 0: 
-            page = random.choice(allpages)
-        else:
-        # random.choices() return a list, however, page should be a string in order to pass it to the 
-        # transition_model()
-            page = random.choices(list(visit_prob), weights = list(visit_prob.values()), k = 1)[0]
-        visit_prob = transition_model(corpus, page, damping_factor)
-        states.append(page)
-        i += 1
-
-
-    pagerank = {}
-    for page in allpages:
-        if page in states:
-            pagerank[page] = states.count(page) / n
-        else:
-            pagerank[page] = 0
-    return pagerank
+    graph = LinkGraph(corpus)
+    rng = random.Random(seed)
+    walkers = max(1, min(walkers, n))
+    tasks = [(graph, damping_factor, n // walkers + (w < n % walkers), rng.getrandbits(64))
+             for w in range(walkers)]
+
+    if walkers == 1:
+        results = [_walk(tasks[0])]
+    else:
+        with multiprocessing.Pool(walkers) as pool:
+            results = pool.map(_walk, tasks)
 
+    counts = [0] * len(graph)
+    for result in results:
+        for i, count in enumerate(result):
+            counts[i] += count
+    return {page: counts[i] / n for i, page in enumerate(graph.pages)}
 
-def iterate_pagerank(corpus, damping_factor):
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -132,30 +442,209 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    # return a dictionary, page and its porb. 
-    # random assgin at the beginning
-    # update page value until change is smaller than 0.001.
+    graph = LinkGraph(corpus)
+    rank, _, _ = power_iteration(graph, damping_factor, tolerance)
+    return dict(zip(graph.pages, rank))
 
-    
-    numhtmls = len(corpus)
-    allpages = list(corpus)
-    pagerank = dict.fromkeys(allpages, 1 / numhtmls)
-    PageRankChange = True
-    while PageRankChange:
-        PageRankChange = False
-        pagerank_copy = pagerank.copy()
-        for html in corpus:
-            pagerank[html] = (1 - damping_factor) / numhtmls
-            for other_html in corpus:
-                if other_html != html and len(corpus[other_html]) != 0 and html in corpus[other_html]:
-                    pagerank[html] += pagerank_copy[other_html] / len(corpus[other_html])
-        
-        total_prob = sum(pagerank.values())
-        for html in pagerank:
-            pagerank[html] = pagerank[html] / total_prob
-            if abs(pagerank[html] - pagerank_copy[html]) >= 0.001:
-                PageRankChange = True
-    return pagerank
+
+def push_residuals(corpus, rank, residual, damping_factor, threshold, max_pushes=None,
+                   dangling=None):
+    """
+    Pushes residual rank along links until every page's residual is at
+    most `threshold` in magnitude, or `max_pushes` pushes have been made,
+    updating `rank` and `residual` (dicts keyed by page) in place.
+    Returns the number of pushes.
+
+    Pushing a page moves its residual into its rank and passes
+    `damping_factor` of it on to the pages it links to, split evenly, so
+    only pages near the residual are touched (Gauss-Southwell / forward
+    push). A page without links passes its share on to the pages in
+    `dangling`, a dictionary of probabilities. If that is None the share
+    is not pushed at all: it would be spread evenly over every page, so
+    it only scales the result, and normalizing the ranks afterwards
+    accounts for it.
+    """
+    queue = deque(page for page in residual if abs(residual[page]) > threshold)
+    queued = set(queue)
+    pushes = 0
+    while queue and pushes != max_pushes:
+        page = queue.popleft()
+        queued.discard(page)
+        mass = residual.pop(page)
+        rank[page] = rank.get(page, 0) + mass
+        pushes += 1
+        links = corpus[page]
+        if links:
+            shares = dict.fromkeys(links, damping_factor * mass / len(links))
+        elif dangling is not None:
+            shares = {link: damping_factor * mass * p for link, p in dangling.items()}
+        else:
+            continue
+        for link, share in shares.items():
+            value = residual.get(link, 0) + share
+            residual[link] = value
+            if abs(value) > threshold and link not in queued:
+                queued.add(link)
+                queue.append(link)
+    return pushes
+
+
+def update_pagerank(corpus, ranks, damping_factor, add_pages=(), remove_pages=(),
+                    add_links=(), remove_links=(), tolerance=TOLERANCE):
+    """
+    Applies the given changes to `corpus` in place and returns PageRank
+    values for the changed corpus, starting from `ranks`, the PageRank
+    values of the corpus before the change.
+
+    Links are (page, linked page) pairs. Removing a page also removes
+    the links to it, and links to or from pages not in the corpus, or
+    from a page to itself, are ignored, as in crawl.
+
+    Only the pages whose incoming share of rank changed start with a
+    residual, which push_residuals then spreads until it is below what
+    `tolerance` allows, so a small edit touches only the pages around
+    it rather than running power iteration over the whole corpus. If an
+    edit reaches so far that pushing costs more than a few iterations
+    would, power iteration finishes the job, starting from the pushed
+    ranks.
+    """
+    # Before the change, each page's rank less what it received through
+    # links was this same amount; new pages start with it as residual
+    dangling_rank = sum(ranks[page] for page in corpus if not corpus[page])
+    base = (1 - damping_factor + damping_factor * dangling_rank) / len(corpus)
+
+    rank = dict(ranks)
+    residual = dict()
+    old_links = dict()
+
+    def change(page, links):
+        # Remember the links a page had before its first change
+        if page not in old_links:
+            old_links[page] = set(corpus[page])
+        corpus[page] = links
+
+    remove_pages = set(remove_pages) & corpus.keys()
+    for page, link in remove_links:
+        if page in corpus and link in corpus[page]:
+            change(page, corpus[page] - {link})
+    if remove_pages:
+        for page in corpus:
+            if page not in remove_pages and corpus[page] & remove_pages:
+                change(page, corpus[page] - remove_pages)
+
+    # A removed page takes its share of rank away from the pages it linked to
+    for page in remove_pages:
+        links = old_links.pop(page, corpus[page])
+        if links:
+            share = damping_factor * rank[page] / len(links)
+            for link in links:
+                residual[link] = residual.get(link, 0) - share
+        del corpus[page]
+        del rank[page]
+
+    for page in add_pages:
+        if page not in corpus:
+            corpus[page] = set()
+            rank[page] = 0
+            residual[page] = base
+    for page, link in add_links:
+        if page in corpus and link in corpus and link != page and link not in corpus[page]:
+            change(page, corpus[page] | {link})
+
+    # A changed page moves its share of rank from its old links to its new ones
+    for page, links in old_links.items():
+        if links:
+            share = damping_factor * rank[page] / len(links)
+            for link in links:
+                residual[link] = residual.get(link, 0) - share
+        if corpus[page]:
+            share = damping_factor * rank[page] / len(corpus[page])
+            for link in corpus[page]:
+                residual[link] = residual.get(link, 0) + share
+    for page in remove_pages:
+        residual.pop(page, None)
+
+    # A residual below this on every page leaves the ranks about as
+    # close to the exact values as power iteration to `tolerance` would
+    threshold = tolerance / len(corpus)
+    push_residuals(corpus, rank, residual, damping_factor, threshold,
+                   max_pushes=PUSHES_PER_PAGE * len(corpus))
+
+    total = sum(rank.values())
+    if any(abs(value) > threshold for value in residual.values()):
+        graph = LinkGraph(corpus)
+        start = [rank[page] / total for page in graph.pages]
+        rank, _, _ = power_iteration(graph, damping_factor, tolerance, start=start)
+        return dict(zip(graph.pages, rank))
+    return {page: rank[page] / total for page in corpus}
+
+
+def personalized_pagerank(corpus, teleport, damping_factor, k=10, tolerance=PERSONALIZED_TOLERANCE,
+                          seed=None):
+    """
+    Returns (top, error): the `k` pages with the highest personalized
+    PageRank as (page, value) pairs, highest first, and a bound such
+    that each estimated value is within `error` (at most `tolerance`) of
+    the exact one with probability at least 1 - FAILURE_PROBABILITY.
+
+    Personalized PageRank replaces the jump to a page chosen at random,
+    both with probability 1 - damping_factor and from pages without
+    links, with a jump to a page chosen from `teleport`: a dictionary of
+    page weights, or a collection of pages weighted equally.
+
+    Rank is first pushed out from the teleport pages (see
+    push_residuals), which settles the pages close to them. The residual
+    left over is then resolved by random walks started from it, each
+    ending at a page with the probability that page gets rank from the
+    residual, as in sample_pagerank. Both steps only touch pages near
+    those the query teleports to, however big the corpus is.
+    """
+    if not isinstance(teleport, dict):
+        teleport = dict.fromkeys(teleport, 1)
+    teleport = {page: weight for page, weight in teleport.items() if page in corpus and weight > 0}
+    if not teleport:
+        raise ValueError("teleport distribution has no pages in the corpus")
+    total = sum(teleport.values())
+    teleport = {page: weight / total for page, weight in teleport.items()}
+
+    # Push until walking off the remaining residual, to within `tolerance`
+    # by Hoeffding's inequality, would cost no more than the pushes did
+    visits = dict()
+    residual = dict(teleport)
+    threshold = tolerance
+    pushes = 0
+    while True:
+        pushes += push_residuals(corpus, visits, residual, damping_factor, threshold,
+                                 dangling=teleport)
+        remaining = sum(residual.values())
+        walks = math.ceil(remaining ** 2 * math.log(2 / FAILURE_PROBABILITY) / (2 * tolerance ** 2))
+        if walks <= (1 - damping_factor) * pushes + 1:
+            break
+        threshold /= 4
+
+    # A page's rank is 1 - damping_factor of the rank pushed to it, plus
+    # its share of the remaining residual
+    ranks = {page: (1 - damping_factor) * value for page, value in visits.items()}
+    error = 0
+    if walks:
+        rng = random.Random(seed)
+        starts = rng.choices(list(residual), weights=list(residual.values()), k=walks)
+        jumps = list(teleport)
+        jump_weights = list(teleport.values())
+        links = dict()
+        for page in starts:
+            while rng.random() < damping_factor:
+                if page not in links:
+                    links[page] = tuple(corpus[page])
+                if links[page]:
+                    page = rng.choice(links[page])
+                else:
+                    page = rng.choices(jumps, weights=jump_weights)[0]
+            ranks[page] = ranks.get(page, 0) + remaining / walks
+        error = remaining * math.sqrt(math.log(2 / FAILURE_PROBABILITY) / (2 * walks))
+
+    top = heapq.nlargest(k, ranks.items(), key=lambda item: item[1])
+    return top, error
 
 
 if __name__ == "__main__":